@@ -2,20 +2,26 @@
 
 # Load Modules
 from pprint import pprint
+import argparse
 import sys
-import math
+import time
 
 from ClusterShell.NodeSet import NodeSet
 
 # Load Local Modules
 from ClushibleApp import __version__
-from ClushibleApp.config import CONFIG
+from ClushibleApp.config import load_config
 from ClushibleApp.utils import msg
-from ClushibleApp.utils.ansible import (
-    validate_ansible_setup,
-    generate_playbook_cmd,
+from ClushibleApp.api import (
+    ClushibleError,
+    Dispatcher,
+    plan,
+    probe_runners,
+    simulate,
 )
-from ClushibleApp.utils.dispatch import get_runner_procs, run
+from ClushibleApp.utils.ansible import validate_ansible_setup
+from ClushibleApp.utils.logstore import LogStore
+from ClushibleApp.utils.telemetry import Telemetry
 
 
 def show_config(args: dict) -> None:
@@ -28,9 +34,56 @@ def show_config(args: dict) -> None:
     sys.stdout.write("====================\n\n")
 
 
-def main() -> int:
-    # Configuration is now a singleton (still namespace-based though)
-    conf = CONFIG
+def logs_main(argv: list) -> int:
+    """clushible logs HOST: print HOST's gathered playbook log."""
+    parser = argparse.ArgumentParser(
+        prog="clushible logs",
+        description="Show a host's playbook log from the log store.",
+    )
+    parser.add_argument("host", help="Target host")
+    parser.add_argument("-r", "--run", help="Run id (default: latest)")
+    parser.add_argument(
+        "-l", "--list", action="store_true", help="List the host's runs"
+    )
+    parser.add_argument("-c", "--config", help="Clushible configuration")
+    parser.add_argument("--log-store", help="Log store (default: config)")
+    args = parser.parse_args(argv)
+
+    path = args.log_store
+    if path is None:
+        conf = load_config(["-c", args.config] if args.config else [])
+        path = conf.clushible.log_store
+    if not path:
+        msg.error("No log_store configured.")
+
+    store = LogStore(path)
+    if args.list:
+        for run_id, lines in store.runs(args.host):
+            print(f"{run_id} ({lines} lines)")
+        return 0
+
+    log = store.read(args.host, args.run)
+    if log is None:
+        msg.error(f"No logs for {args.host}.")
+    sys.stdout.write(log)
+    return 0
+
+
+def main(argv: list = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["logs"]:
+        return logs_main(argv[1:])
+
+    # Configuration is built here, not at import time
+    started = time.monotonic()
+    conf = load_config(argv)
+    conf.clushible.telemetry = Telemetry()
+    conf.clushible.telemetry.add("config", time.monotonic() - started)
+
+    if conf.clushible.relay:
+        # stdout carries only the relayed runner records (see Run.line)
+        sys.stdout = sys.stderr
 
     if conf.core.version:
         print(f"Clushible {__version__}")
@@ -39,14 +92,8 @@ def main() -> int:
     if conf.core.verbose > 2:
         show_config(conf)
 
-    runners = NodeSet(conf.clushible.runners)
     targets = NodeSet(conf.clushible.targets)
 
-    if len(runners) == 0:
-        msg.warn("No runners specified, defaulting to localhost.")
-        conf.clushible.runners = "localhost"
-        runners = NodeSet(conf.clushible.runners)
-
     if len(targets) == 0:
         msg.error("No targets specified, exiting.")
 
@@ -68,92 +115,50 @@ def main() -> int:
     # Validate Ansible Paths Locally
     validate_ansible_setup(conf)
 
-    # Return a dictionary of nproc (or equivalent) processor count on the runners
-    rprocs = get_runner_procs(conf)
-
-    # Reset runners based on testing usable runners
-    runners = NodeSet(conf.clushible.runners)
-
-    # Make sure fscale is set to non-zero
-    if conf.clushible.fscale == 0:
-        conf.clushible.fscale = 4  # Empirical default
-
-    # Assume count of runners is good for now
-    FORCED_NSETS = False
-    if conf.clushible.nsets == 0:
-        conf.clushible.nsets = len(runners)
-    else:
-        FORCED_NSETS = True
-
-    if int(conf.clushible.nsets) > len(targets):
-        msg.warn(
-            "nsets greater than len(targets), shrinking nsets to len(targets)."
-        )
-        conf.clushible.nsets = len(targets)
-    if conf.ansible.forks == 0:
-        if conf.core.verbose > 0:
-            msg.info(
-                f"Forks is auto-detected. Setting to {int(conf.clushible.fscale * min(rprocs.values()))}"
-            )
-        conf.ansible.forks = int(conf.clushible.fscale * min(rprocs.values()))
-
-    # MAGIC
-    subtargets = []
-    if len(targets) / conf.clushible.nsets > int(
-        conf.clushible.fscale * min(rprocs.values())
-    ):
-        if FORCED_NSETS:
-            msg.warn(
-                "nsets specified as non-zero, but greater than recommended forks, expect slow down."
-            )
-        else:
-            conf.clushible.nsets = math.ceil(
-                len(targets) / (conf.clushible.fscale * min(rprocs.values()))
-            )
-            if conf.core.verbose > 0:
-                msg.info(
-                    f"Setting nsets with groups of ~{conf.clushible.fscale}*{min(rprocs.values())} for '{conf.clushible.distribution}' distribution."
-                )
-
-    if conf.clushible.distribution == "pack":
-        tgt = list(targets)
-        for i in range(0, len(targets), conf.ansible.forks):
-            subtargets.append(
-                NodeSet.fromlist(tgt[i : i + conf.ansible.forks])
-            )
-    else:
-        # if conf.clushible.distribution == 'scatter'
-        subtargets = [x for x in targets.split(conf.clushible.nsets)]
-
-    if conf.core.verbose > 0:
-        msg.info(f"Number of subtargets sets: {len(subtargets)}")
-        for s in subtargets:
-            msg.info(f"subtarget: {s} ({len(s)})")
+    try:
+        capacity = probe_runners(conf)
+        p = plan(targets, capacity, conf=conf)
+        if conf.clushible.simulate:
+            print(simulate(p.targets, capacity, conf=conf)[2])
+            return 0
+    except ClushibleError as e:
+        msg.error(f"{e}, exiting.")
 
     if conf.clushible.partition_only:
         return 0
 
-    # Data Deployment (if !nfs, do some sort of VCS operation and place password
-    # file in a proper spot. This might include doing some operations in a
-    # location like /tmp or /var/tmp.)
-    # TODO
-
-    # Generate Ansible Playbook Commands
-    playbook_cmd = [generate_playbook_cmd(conf, t) for t in subtargets]
-
+    # Runners pull chunks and generate their Ansible playbook commands
+    # (the project is shipped first with transport=git, see sync_project).
     # Results collected and returned as large string as usually collated
-    results = run(conf, playbook_cmd)
-    print(results)
-
-    # Data Gather
-    # Gather Log as necessary.
+    try:
+        result = Dispatcher(conf).execute(p)
+    except ClushibleError as e:
+        msg.error(f"{e}, exiting.")
+    for output in result.outputs:
+        if output is not None:
+            print(output)
 
     # Error Reports
-    # Find any worrisome errors.
-
-    # Do a final cleanup
+    report = result.report
+    if (
+        report.failovers
+        or len(report.unrun)
+        or len(report.aborted)
+        or len(report.dead)
+    ):
+        msg.warn(f"Hosts moved or not run\n{report.failover_summary()}")
+    if not conf.core.dry_run:
+        failed = report.failed()
+        if len(failed) > 0:
+            msg.warn(
+                f"Failed, unreachable or unreported hosts: {failed} ({len(failed)})"
+            )
+        if conf.core.verbose > 0:
+            msg.info(f"Host Status\n{report.summary(targets)}")
 
-    # Exit / Complete
+    # Exit / Complete (failed hosts return 2 like ansible-playbook)
+    if len(result.failed) > 0:
+        return 2
     return 0
 
 
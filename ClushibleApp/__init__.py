@@ -1,3 +1,26 @@
 from ._version import version, __version__
+from .api import (
+    Capacity,
+    ClushibleError,
+    Dispatcher,
+    Plan,
+    Result,
+    plan,
+    probe_runners,
+    simulate,
+)
+from .config import load_config
 
-__all__ = ["version", "__version__"]
+__all__ = [
+    "version",
+    "__version__",
+    "Capacity",
+    "ClushibleError",
+    "Dispatcher",
+    "Plan",
+    "Result",
+    "load_config",
+    "plan",
+    "probe_runners",
+    "simulate",
+]
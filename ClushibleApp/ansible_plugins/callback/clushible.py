@@ -0,0 +1,73 @@
+# Clushible stdout callback: one compact JSON object per line.
+#
+# Copied into each run's stage and enabled through ANSIBLE_CALLBACK_PLUGINS
+# and ANSIBLE_STDOUT_CALLBACK=clushible by generate_playbook_cmd; parsed on
+# the controller by ClushibleApp.utils.events.
+
+from __future__ import annotations
+
+import json
+
+from ansible.plugins.callback import CallbackBase
+
+DOCUMENTATION = """
+    name: clushible
+    type: stdout
+    short_description: JSON lines for the Clushible controller
+    description:
+        - Emits one JSON object per line for task starts, per-host task
+          results and the PLAY RECAP, for Clushible to collate and report.
+"""
+
+
+def _get(result, name):
+    # ansible-core >= 2.19 exposes result/host/task; older releases _result...
+    value = getattr(result, name, None)
+    if value is None:
+        value = getattr(result, f"_{name}")
+    return value
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = "stdout"
+    CALLBACK_NAME = "clushible"
+
+    def _emit(self, **record):
+        self._display.display(
+            json.dumps(record, separators=(",", ":"), default=str)
+        )
+
+    def _result(self, result, status):
+        res = _get(result, "result")
+        msg = res.get("msg") or res.get("stderr") or ""
+        if status == "ok" and res.get("changed", False):
+            status = "changed"
+        self._emit(
+            e=status,
+            h=_get(result, "host").get_name(),
+            t=_get(result, "task").get_name(),
+            m=str(msg),
+        )
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._emit(e="task", t=task.get_name())
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._emit(e="task", t=task.get_name())
+
+    def v2_runner_on_ok(self, result):
+        self._result(result, "ok")
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._result(result, "ignored" if ignore_errors else "failed")
+
+    def v2_runner_on_unreachable(self, result):
+        self._result(result, "unreachable")
+
+    def v2_runner_on_skipped(self, result):
+        self._result(result, "skipped")
+
+    def v2_playbook_on_stats(self, stats):
+        for host in sorted(stats.processed):
+            self._emit(e="recap", h=host, **stats.summarize(host))
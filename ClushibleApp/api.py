@@ -0,0 +1,479 @@
+#!/usr/bin/env python3.12
+"""Programmatic interface to Clushible.
+
+>>> conf = load_config([], files=["/etc/clushible.toml"])
+>>> capacity = probe_runners(conf)
+>>> p = plan("dec[0001-2488]", capacity, "scatter", conf=conf)
+>>> result = Dispatcher(conf).execute(p)
+>>> result.failed
+"""
+
+import asyncio
+import copy
+import datetime as dt
+import math
+import os
+from dataclasses import dataclass, field
+
+from ClusterShell.NodeSet import NodeSet
+from ClusterShell.Task import task_self
+
+from .config import load_config
+from .utils import msg
+from .utils.affinity import split_local, target_homes
+from .utils.ansible import write_limit_files
+from .utils.dispatch import (
+    RunnerCapacity,
+    chunk_subtargets,
+    get_runner_capacity,
+    get_runner_forks,
+    run,
+)
+from .utils.errors import ClushibleError
+from .utils.events import stage_callback
+from .utils.facts import gather_facts, seed_facts
+from .utils.inventory import write_inventory_slices
+from .utils.logstore import gather_logs
+from .utils.partition import POLICIES, partition
+from .utils.reach import filter_reachable
+from .utils.history import fscale_slowdowns, host_costs, known_costs
+from .utils.report import Report
+from .utils.rolling import parse_cap
+from .utils.simulate import (
+    FSCALES,
+    Prediction,
+    simulate_queue,
+    simulation_report,
+    slowdown_at,
+)
+from .utils.stage import cleanup_stage, push_stage
+from .utils.telemetry import Telemetry, timer, write_telemetry
+from .utils.transport import sync_project
+from .utils.tree import setup_tree, use_tree
+
+
+@dataclass(frozen=True)
+class Capacity:
+    """Usable runners and what each can take."""
+
+    runners: str
+    caps: dict  # runner -> RunnerCapacity
+    forks: dict  # runner -> forks
+
+    @property
+    def base_forks(self) -> int:
+        """Forks of the smallest runner; chunks are sized from it."""
+        return min(self.forks.values())
+
+
+@dataclass(frozen=True)
+class Plan:
+    """Immutable partition of targets into chunks for a set of runners."""
+
+    targets: str
+    runners: str
+    distribution: str
+    nsets: int
+    forks: int
+    runner_forks: tuple  # ((runner, forks), ...)
+    chunks: tuple  # (str(NodeSet), ...)
+    unreachable: str = ""  # targets dropped by --reach-check
+
+    def nodesets(self) -> list:
+        return [NodeSet(c) for c in self.chunks]
+
+
+@dataclass
+class Result:
+    """Outcome of executing a plan."""
+
+    outputs: list = field(default_factory=list)  # one per dispatch round
+    report: Report = field(default_factory=Report)
+    telemetry: dict = None  # phase timings and per-chunk records
+
+    @property
+    def status(self) -> dict:
+        """host -> ok, changed, failed or unreachable."""
+        return dict(self.report.status)
+
+    @property
+    def failed(self) -> NodeSet:
+        """Hosts that failed, were unreachable or never ran."""
+        failed = self.report.failed()
+        failed.update(self.report.unrun)
+        failed.update(self.report.aborted)
+        failed.update(self.report.dead)
+        return failed
+
+
+def _conf(conf):
+    return conf if conf is not None else load_config([])
+
+
+def _gateway_capacity(conf, rcaps: dict) -> dict:
+    """Fold the runners' capacity into one per --tree-nested gateway.
+
+    The gateways become the runners: chunks are sized for, and pulled by,
+    a gateway as a whole and it sub-partitions them itself.
+    """
+    caps = dict()
+    for gw, leaves in conf.clushible.tree_leaves.items():
+        mine = [rcaps[r] for r in NodeSet(leaves) if r in rcaps]
+        if not mine:
+            msg.warn(f"No usable runners behind gateway {gw}; excluding it.")
+            continue
+        caps[gw] = RunnerCapacity(
+            cores=sum(c.cores for c in mine),
+            mem_kb=sum(c.mem_kb for c in mine),
+            load=sum(c.load for c in mine),
+        )
+        conf.clushible.tree_leaves[gw] = str(
+            NodeSet.fromlist(r for r in NodeSet(leaves) if r in rcaps)
+        )
+    conf.clushible.runners = str(NodeSet.fromlist(caps))
+    return caps
+
+
+def probe_runners(conf=None, runners: str = None) -> Capacity:
+    """Probe runners (default: conf.clushible.runners) for their capacity."""
+    conf = _conf(conf)
+    if runners is not None:
+        conf.clushible.runners = runners
+    if len(NodeSet(conf.clushible.runners)) == 0:
+        msg.warn("No runners specified, defaulting to localhost.")
+        conf.clushible.runners = "localhost"
+
+    # Make sure fscale is set to non-zero
+    if conf.clushible.fscale == 0:
+        conf.clushible.fscale = 4  # Empirical default
+
+    # Runners behind gateways are probed (and later driven) through them
+    setup_tree(conf)
+
+    # Dictionary of cores, free memory and load on the usable runners
+    with timer(conf, "probe"):
+        rcaps = get_runner_capacity(conf)
+    if getattr(conf.clushible, "tree_leaves", None):
+        rcaps = _gateway_capacity(conf, rcaps)
+    if len(rcaps) == 0:
+        raise ClushibleError("No usable runners")
+
+    # Each runner gets forks sized to its own capacity; sets are sized for
+    # the smallest and larger runners take several at a time.
+    return Capacity(
+        conf.clushible.runners, rcaps, get_runner_forks(conf, rcaps)
+    )
+
+
+def plan_chunks(
+    conf, targets: NodeSet, runners: NodeSet, base_forks: int, forced_nsets
+) -> list:
+    """Partition targets into subtarget sets and cut them into chunks."""
+    if not forced_nsets:
+        conf.clushible.nsets = len(runners)
+
+    if int(conf.clushible.nsets) > len(targets):
+        msg.warn(
+            "nsets greater than len(targets), shrinking nsets to len(targets)."
+        )
+        conf.clushible.nsets = len(targets)
+
+    # MAGIC
+    if len(targets) / conf.clushible.nsets > base_forks:
+        if forced_nsets:
+            msg.warn(
+                "nsets specified as non-zero, but greater than recommended forks, expect slow down."
+            )
+        else:
+            conf.clushible.nsets = math.ceil(len(targets) / base_forks)
+            if conf.core.verbose > 0:
+                msg.info(
+                    f"Setting nsets with groups of ~{base_forks} for '{conf.clushible.distribution}' distribution."
+                )
+
+    subtargets = partition(conf, targets)
+    if conf.clushible.affinity:
+        # Keep each set to one home so its chunks can stay local
+        homes = target_homes(conf, targets, runners)
+        subtargets = split_local(subtargets, homes)
+        if conf.core.verbose > 0:
+            for home, local in homes.items():
+                msg.info(f"Affinity: {local} ({len(local)}) -> {home}")
+
+    if conf.core.verbose > 0:
+        msg.info(f"Number of subtargets sets: {len(subtargets)}")
+        for s in subtargets:
+            msg.info(f"subtarget: {s} ({len(s)})")
+
+    # Cut subtargets into chunks for the runners' shared work queue
+    chunks = chunk_subtargets(conf, subtargets, len(runners))
+    if conf.core.verbose > 1:
+        for c in chunks:
+            msg.info(f"chunk: {c} ({len(c)})")
+
+    return chunks
+
+
+def plan(targets, runners: Capacity, policy: str = None, conf=None) -> Plan:
+    """Partition targets over runners with distribution policy.
+
+    policy is one of the --distribution choices (conf's when None). With
+    --reach-check, targets the runners can't connect to are left out of the
+    plan (Plan.unreachable). conf itself is left untouched.
+    """
+    conf = copy.deepcopy(_conf(conf))
+    targets = NodeSet(targets)
+    if len(targets) == 0:
+        raise ClushibleError("No targets specified")
+    if policy is not None:
+        conf.clushible.distribution = policy
+    # Checked here rather than once dispatch has started
+    parse_cap(conf.clushible.max_inflight, len(targets))
+
+    dead = NodeSet()
+    if conf.clushible.reach_check:
+        with timer(conf, "reach"):
+            targets, dead = filter_reachable(conf, targets, runners.runners)
+        if len(targets) == 0:
+            raise ClushibleError(f"No reachable targets ({dead})")
+
+    conf.clushible.runner_forks = dict(runners.forks)
+    if conf.ansible.forks == 0:
+        if conf.core.verbose > 0:
+            msg.info(
+                f"Forks is auto-detected. Setting to {runners.base_forks} (per runner: {runners.forks})"
+            )
+        conf.ansible.forks = runners.base_forks
+
+    forced_nsets = conf.clushible.nsets != 0
+    with timer(conf, "partition"):
+        chunks = plan_chunks(
+            conf,
+            targets,
+            NodeSet(runners.runners),
+            runners.base_forks,
+            forced_nsets,
+        )
+    return Plan(
+        targets=str(targets),
+        runners=runners.runners,
+        distribution=conf.clushible.distribution,
+        nsets=conf.clushible.nsets,
+        forks=conf.ansible.forks,
+        runner_forks=tuple(sorted(runners.forks.items())),
+        chunks=tuple(str(c) for c in chunks),
+        unreachable=str(dead),
+    )
+
+
+def _predict(conf, targets, capacity, costs, slowdowns, policy, fscale, nsets):
+    conf = copy.deepcopy(conf)
+    conf.clushible.distribution = policy
+    conf.clushible.fscale = fscale
+    conf.clushible.nsets = nsets
+    conf.core.verbose = 0
+
+    forks = get_runner_forks(conf, capacity.caps)
+    base_forks = min(forks.values())
+    if conf.ansible.forks == 0:
+        conf.ansible.forks = base_forks
+    chunks = plan_chunks(
+        conf, targets, NodeSet(capacity.runners), base_forks, nsets != 0
+    )
+
+    finish, busy = simulate_queue(
+        chunks, forks, costs, slowdown_at(slowdowns, fscale)
+    )
+    return Prediction(policy, fscale, nsets, len(chunks), finish, busy)
+
+
+def simulate(targets, capacity: Capacity, conf=None) -> tuple:
+    """Predict dispatch of targets under every policy, fscale and nsets.
+
+    Host costs come from the runtime history and fork contention from the
+    slowdowns past runs measured per fscale (with none yet, the configured
+    fscale is the reference and larger ones are assumed to gain nothing).
+    Returns (predictions, current, report), current being the configured
+    fscale/nsets under each policy.
+    """
+    conf = copy.deepcopy(_conf(conf))
+    targets = NodeSet(targets)
+    if len(targets) == 0:
+        raise ClushibleError("No targets specified")
+
+    costs = host_costs(conf, targets)
+    measured = fscale_slowdowns(conf)
+    slowdowns = measured or {conf.clushible.fscale: 1.0}
+    nrunners = len(capacity.caps)
+
+    # fscale only matters when forks are auto
+    forks_fixed = conf.ansible.forks != 0
+    fscales = {conf.clushible.fscale}
+    if not forks_fixed:
+        fscales.update(FSCALES)
+
+    def predict(policy, fscale, nsets):
+        p = _predict(
+            conf, targets, capacity, costs, slowdowns, policy, fscale, nsets
+        )
+        p.measured = fscale in measured
+        return p
+
+    def nsets_choices(fscale):
+        # Forced sets larger than forks are what plan() warns against
+        forks = (
+            get_runner_forks(conf, capacity.caps)
+            if forks_fixed
+            else {r: c.forks(fscale) for r, c in capacity.caps.items()}
+        )
+        limit = len(targets) / min(forks.values())
+        return [0] + [
+            n
+            for n in (nrunners, 2 * nrunners, 4 * nrunners)
+            if limit <= n <= len(targets)
+        ]
+
+    predictions = []
+    current = []
+    with timer(conf, "simulate"):
+        for policy in POLICIES:
+            for fscale in sorted(fscales):
+                # pack sizes sets by forks alone; nsets doesn't change it
+                choices = [0] if policy == "pack" else nsets_choices(fscale)
+                for nsets in choices:
+                    predictions.append(predict(policy, fscale, nsets))
+            nsets = 0 if policy == "pack" else conf.clushible.nsets
+            current.append(predict(policy, conf.clushible.fscale, nsets))
+
+    known = len(known_costs(conf, targets))
+    sources = (
+        f"Simulated {len(targets)} targets on {nrunners} runners."
+        f" Runtime history for {known}/{len(targets)} hosts"
+        " (the rest count as the median, or 1s without history);"
+        " fork slowdown measured at fscale"
+        f" {', '.join(str(f) for f in sorted(measured)) or 'none yet'}."
+    )
+    report = simulation_report(predictions, current, sources, forks_fixed)
+    return predictions, current, report
+
+
+def stage_chunks(conf, chunks: list) -> None:
+    """Stage the callback and per-chunk slices or limit files on runners.
+
+    Keeps commands and Ansible's inventory/limit parsing small regardless
+    of chunk size.
+    """
+    if conf.clushible.slice_inventory:
+        write_inventory_slices(conf, chunks)
+    elif conf.clushible.limit == "file":
+        write_limit_files(conf, chunks)
+    if conf.clushible.fact_cache:
+        seed_facts(conf, chunks)
+    stage_callback(conf)
+    push_stage(conf)
+
+
+class Dispatcher:
+    """Executes plans; safe to reuse for many runs in one process.
+
+    sink, if given, is called as sink(runner, chunk_id, line) for every
+    line of runner output as it arrives.
+    """
+
+    def __init__(self, conf=None, sink=None):
+        self.conf = _conf(conf)
+        self.sink = sink
+
+    def _dispatch(self, conf, chunks: list, result: Result) -> None:
+        """One round: stage, run the chunks, gather facts back."""
+        if not conf.core.dry_run:
+            result.report.dispatched(NodeSet.fromlist(chunks))
+        with timer(conf, "stage"):
+            stage_chunks(conf, chunks)
+        with timer(conf, "dispatch"):
+            result.outputs.append(
+                run(conf, chunks, sink=self.sink, report=result.report)
+            )
+        if conf.clushible.fact_cache:
+            with timer(conf, "fact_gather"):
+                gather_facts(conf)
+
+    def execute(self, plan: Plan) -> Result:
+        """Dispatch plan, re-running failed hosts up to --retry-failed."""
+        conf = copy.deepcopy(self.conf)
+        conf.clushible.runners = plan.runners
+        conf.clushible.distribution = plan.distribution
+        conf.clushible.nsets = plan.nsets
+        conf.ansible.forks = plan.forks
+        conf.clushible.runner_forks = dict(plan.runner_forks)
+
+        # Forks derived from fscale: measure how this fscale behaves, or
+        # keep retuning them (--adaptive-forks); fixed forks stay put
+        auto_forks = self.conf.ansible.forks == 0
+        conf.clushible.auto_forks = auto_forks
+        conf.clushible.adaptive_forks &= auto_forks
+        conf.clushible.sample_fscale = (
+            conf.clushible.fscale
+            if auto_forks and not conf.clushible.adaptive_forks
+            else None
+        )
+
+        # Identifies this run's artifacts on the controller and runners
+        conf.clushible.run_id = (
+            f"{dt.datetime.now():%Y%m%d-%H%M%S}.{os.getpid()}.{id(plan):x}"
+        )
+
+        # Phases timed before this (e.g. by main()) share the recorder
+        if getattr(conf.clushible, "telemetry", None) is None:
+            conf.clushible.telemetry = Telemetry()
+
+        # The topology probe_runners() loaded lives in its thread's task;
+        # dispatching from another thread (execute_async) needs it too
+        tree = conf.clushible.topology or conf.clushible.gateways
+        if tree and task_self().topology is None:
+            use_tree(conf)
+
+        result = Result()
+        result.report.unreachable(NodeSet(plan.unreachable))
+        chunks = plan.nodesets()
+        try:
+            if conf.clushible.transport == "git":
+                with timer(conf, "transport"):
+                    sync_project(conf)
+                if len(NodeSet(conf.clushible.runners)) == 0:
+                    raise ClushibleError("No runners left after git sync")
+
+            # Runners pull chunks and generate their Ansible playbook commands
+            self._dispatch(conf, chunks, result)
+
+            # Re-run only the hosts that failed or were unreachable
+            for attempt in range(1, conf.clushible.retry_failed + 1):
+                failed = result.report.failed()
+                if len(failed) == 0 or result.report.abort_reason:
+                    break
+
+                msg.info(
+                    f"Retry {attempt}/{conf.clushible.retry_failed}: {failed} ({len(failed)})"
+                )
+                runners = NodeSet(conf.clushible.runners)
+                base_forks = min(conf.clushible.runner_forks.values())
+                chunks = plan_chunks(conf, failed, runners, base_forks, False)
+                self._dispatch(conf, chunks, result)
+
+            # Data Gather (--tree-nested gateways gather into their own)
+            nested = getattr(conf.clushible, "tree_leaves", None)
+            if conf.clushible.log_store and not nested:
+                with timer(conf, "log_gather"):
+                    gather_logs(conf)
+        finally:
+            # Do a final cleanup
+            with timer(conf, "cleanup"):
+                cleanup_stage(conf)
+
+        result.telemetry = write_telemetry(conf)
+        return result
+
+    async def execute_async(self, plan: Plan) -> Result:
+        """execute() in a worker thread, which gets its own ClusterShell task."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.execute, plan)
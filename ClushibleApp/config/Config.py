@@ -2,6 +2,7 @@
 
 import argparse
 from dataclasses import dataclass
+import functools
 import os
 from pathlib import Path
 import sys
@@ -17,7 +18,6 @@ from pprint import pprint
 
 from .._version import __version__
 
-
 _type_map = {
     "str": str,
     "int": int,
@@ -39,6 +39,8 @@ class ArgumentOption:
     default: Any = None
     type: Any = None
     choices: list = None
+    nargs: Any = None
+    const: Any = None
     example: Any = None
     internal_default: Any = None
     file_option: bool = True
@@ -57,10 +59,9 @@ def _dict_to_namespace(d: dict) -> SimpleNamespace:
         return d
 
 
+@functools.lru_cache(maxsize=None)
 def _load_toml_opts():
-    """
-    Docstring for _load_toml_opts
-    """
+    """Load the option schema (options.toml); parsed once per process."""
     opts_file = Path(__file__).parent / "options.toml"
     with opts_file.open("rb") as f:
         data = tomllib.load(f)
@@ -68,6 +69,7 @@ def _load_toml_opts():
     return data
 
 
+@functools.lru_cache(maxsize=None)
 def _generate_argument_options():
     """Generate argument options from the TOML configuration."""
     config_data = _load_toml_opts()
@@ -84,6 +86,8 @@ def _generate_argument_options():
                 default=option_values.get("default", None),
                 type=_type_map[option_values.get("type", "Any")],
                 choices=option_values.get("choices"),
+                nargs=option_values.get("nargs"),
+                const=option_values.get("const"),
                 example=option_values.get("example", "None"),
                 internal_default=option_values.get("internal_default", None),
                 file_option=option_values.get("file_option", True),
@@ -111,9 +115,12 @@ def _generate_cli_parser():
             section.capitalize(), f"{section.capitalize()} Options"
         )
         for option_key, option in options.items():
+            if not option.cli_option:
+                continue
             kwargs = {
                 "dest": option.dest,
-                "help": option.help,
+                # argparse expands %-formats in help (e.g. %(default)s)
+                "help": option.help.replace("%", "%%"),
             }
 
             # If action is specific, don't specify type
@@ -124,6 +131,8 @@ def _generate_cli_parser():
                 else:
                     if option.type:
                         kwargs["type"] = option.type
+            elif option.type not in {None, Any}:
+                kwargs["type"] = option.type
 
             if option.default not in {None, "None"}:
                 kwargs["default"] = option.default
@@ -133,6 +142,10 @@ def _generate_cli_parser():
             if option.choices:
                 kwargs["choices"] = option.choices
 
+            if option.nargs:
+                kwargs["nargs"] = option.nargs
+                kwargs["const"] = option.const
+
             group.add_argument(*option.name, **kwargs)
 
     return parser
@@ -178,6 +191,10 @@ def _dump_config_template():
             if isinstance(value, bool):
                 value = f"{str(value).lower()}"
 
+            if isinstance(value, dict):
+                pairs = ", ".join(f'"{k}" = "{v}"' for k, v in value.items())
+                value = f"{{ {pairs} }}"
+
             if value is None:
                 value = '"None"'
 
@@ -205,9 +222,9 @@ def _load_config(config_path: Path) -> dict:
         sys.exit(1)
 
 
-def _get_cli_args() -> argparse.Namespace:
+def _get_cli_args(argv: list = None) -> argparse.Namespace:
     args = _generate_cli_parser()
-    pargs = args.parse_args()
+    pargs = args.parse_args(argv)
     return pargs
 
 
@@ -228,22 +245,48 @@ def _construct_default_config() -> dict:
     return default_config
 
 
-def _overlay_config_files(config: dict, config_files: list[str] = []) -> None:
-    if len(config_files) == 0:
+def to_argv(conf: SimpleNamespace, skip: set = frozenset()) -> list:
+    """Command line arguments for conf's options that differ from defaults.
+
+    skip holds "section.option" names to leave out. Options without a CLI
+    argument (and store_true options turned off) can't be passed on.
+    """
+    defaults = _construct_default_config()
+    argv = []
+    for section, options in _generate_argument_options().items():
+        for key, option in options.items():
+            if not option.cli_option or f"{section}.{key}" in skip:
+                continue
+            value = getattr(getattr(conf, section), key, None)
+            if value in {None, ""} or value == defaults[section][key]:
+                continue
+            flag = option.name[-1]
+            if option.action == "store_true":
+                if value is True:
+                    argv.append(flag)
+            elif option.action == "count":
+                argv.extend([flag] * value)
+            else:
+                argv.extend([flag, str(value)])
+    return argv
+
+
+def _overlay_config_files(config: dict, config_files: list = None) -> None:
+    if config_files is None:
+        config_files = []
         if "CLUSHIBLE_CONFIG" in os.environ.keys():
             config_files.append(os.environ["CLUSHIBLE_CONFIG"])
         config_files.append("/etc/clushible.toml")
         config_files.append(f"{sys.prefix}/etc/clushible.toml")
 
-    config_files[:] = [p for p in config_files if p]
-
-    c = Path(config_files.pop(0))
-    while not c.exists():
+    # First existing file wins
+    for c in (Path(p) for p in config_files if p):
+        if c.exists():
+            break
         print(f"Popping {c} from config list as not found.")
-        c = Path(config_files.pop(0))
-        if len(config_files) == 0:
-            print("No suitable configuration file found. Using defaults only.")
-            return config
+    else:
+        print("No suitable configuration file found. Using defaults only.")
+        return
 
     toml_conf = _load_config(c)
     for section, opts in toml_conf.items():
@@ -282,18 +325,16 @@ def _pre_process_cli_args(args: argparse.Namespace) -> None:
         sys.exit(0)
 
 
-def _get_config(args: argparse.Namespace) -> dict:
+def _get_config(args: argparse.Namespace, files: list = None) -> dict:
     """Get the final configuration by overlaying defaults, config files, and CLI args."""
     config = _construct_default_config()
 
     _pre_process_cli_args(args)
 
     # Overlay config files
-    try:
-        if args.core_config:
-            config_files = [args.core_config]
-    except AttributeError:
-        config_files = []
+    config_files = files
+    if getattr(args, "core_config", None):
+        config_files = [args.core_config]
 
     _overlay_config_files(config, config_files)
 
@@ -303,7 +344,25 @@ def _get_config(args: argparse.Namespace) -> dict:
     return config
 
 
-CONFIG = _dict_to_namespace(_get_config(_get_cli_args()))
+def load_config(argv: list = None, files: list = None) -> SimpleNamespace:
+    """Build a configuration namespace.
+
+    argv is parsed like the command line (sys.argv[1:] when None; pass []
+    for library use). files replaces the default config file search
+    (CLUSHIBLE_CONFIG, /etc, sys.prefix/etc), [] skipping config files
+    altogether; -c in argv still wins.
+    """
+    return _dict_to_namespace(_get_config(_get_cli_args(argv), files))
+
+
+def __getattr__(name: str):
+    # CONFIG is built from sys.argv on first use rather than at import time
+    if name == "CONFIG":
+        global CONFIG
+        CONFIG = load_config()
+        return CONFIG
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Main block for testing purposes for now
 if __name__ == "__main__":
@@ -1,2 +1,11 @@
 # __init__.py
-from .Config import CONFIG as CONFIG
+from .Config import load_config as load_config
+
+
+def __getattr__(name: str):
+    # CONFIG is built lazily (parses sys.argv) on first access
+    if name == "CONFIG":
+        from . import Config
+
+        return Config.CONFIG
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3.12
+import json
+
+# 1-minute load average per core above which a runner is overloaded
+LOAD_HIGH = 1.0
+
+# Multiplicative decrease on overload; increases add this many forks per
+# core of the runner
+DECREASE = 0.75
+INCREASE_PER_CORE = 0.5
+
+# Record the sampler prints on the runner's output stream (absolute paths
+# like the other runner commands; the sampler is Linux only anyway)
+LOAD_RECORD = '{"e":"load"'
+_SAMPLE = (
+    r'echo "{\"e\":\"load\",'
+    r'\"l\":$(/usr/bin/cut -d" " -f1 /proc/loadavg),'
+    r"\"c\":$(/usr/bin/nproc),"
+    r'\"m\":$(/usr/bin/awk "/^MemAvailable:/ {print \$2}" /proc/meminfo)}"'
+)
+
+
+def sampler_cmd(interval: float) -> str:
+    """Shell prefix starting a background load sampler on the runner.
+
+    It shares the chunk's ssh session and stdout, so sampling costs no extra
+    connections; pair with sampler_stop(). The sleep gets no stdout: killing
+    the sampler leaves it running out its interval, and holding the stream
+    open it would hold the chunk's command until then.
+    """
+    return (
+        f"( while /usr/bin/sleep {interval} >/dev/null; do {_SAMPLE}; done )"
+        " & CLUSHIBLE_SAMPLER=$!; "
+    )
+
+
+def sampler_stop() -> str:
+    """Shell command stopping the sampler."""
+    return "kill $CLUSHIBLE_SAMPLER 2>/dev/null;"
+
+
+class ForksController:
+    """AIMD control of each runner's forks from sampled load and memory.
+
+    Runners report load and available memory while they run chunks. When a
+    runner finishes a chunk, its forks drop by DECREASE if any sample
+    during it showed it overloaded (load per core over LOAD_HIGH, or less
+    memory than a fork needs), else grow by INCREASE_PER_CORE forks per
+    core. Without samples (a chunk shorter than the interval) forks stay
+    as they are. validated holds the last forks each runner kept busy
+    through a chunk while sampled within limits, to start from next time.
+    """
+
+    def __init__(self, runner_forks: dict, fork_mem_kb: int):
+        self.forks = dict(runner_forks)
+        self.fork_mem_kb = fork_mem_kb
+        self.cores = dict()  # runner -> cores, from its samples
+        self.sampled = set()  # runners sampled since their last pull
+        self.overloaded = set()  # ... and found overloaded
+        self.validated = dict()  # runner -> forks of its last good chunk
+
+    def sample(self, runner: str, line: str) -> None:
+        """Fold in a load record printed by sampler_cmd()."""
+        try:
+            record = json.loads(line)
+            load, cores, mem_kb = record["l"], record["c"], record["m"]
+        except (ValueError, KeyError, TypeError):
+            return
+
+        self.cores[runner] = cores
+        self.sampled.add(runner)
+        if load / max(cores, 1) > LOAD_HIGH or mem_kb < self.fork_mem_kb:
+            self.overloaded.add(runner)
+
+    def next_forks(self, runner: str, hosts: int) -> int:
+        """Forks for runner's next chunk, once it ran one of hosts."""
+        forks = self.forks[runner]
+        if runner in self.overloaded:
+            forks = max(int(forks * DECREASE), 1)
+        elif runner in self.sampled:
+            if hosts >= forks:
+                self.validated[runner] = forks
+            cores = self.cores.get(runner, 1)
+            forks += max(int(cores * INCREASE_PER_CORE), 1)
+        self.sampled.discard(runner)
+        self.overloaded.discard(runner)
+        self.forks[runner] = forks
+        return forks
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3.12
+from types import SimpleNamespace
+
+from ClusterShell.NodeSet import NodeSet, NodeSetExternalError
+from ClusterShell.NodeUtils import GroupResolverError
+
+from .errors import ClushibleError
+
+
+def _group_scopes(conf, runners: NodeSet) -> list:
+    """[(targets, runners)] for each ClusterShell group holding runners.
+
+    Groups of --affinity-source (the default source when empty) that
+    contain a runner make its neighbourhood. Groups holding every runner
+    (e.g. @all) say nothing about locality and are skipped.
+    """
+    source = conf.clushible.affinity_source or None
+    scopes = dict()
+    try:
+        for runner in runners:
+            for name, (members, _) in NodeSet(runner).groups(source).items():
+                if name not in scopes:
+                    scopes[name] = (members, members.intersection(runners))
+    except (GroupResolverError, NodeSetExternalError) as e:
+        raise ClushibleError(f"Unable to resolve affinity groups: {e}")
+
+    return [
+        (members, mine)
+        for members, mine in scopes.values()
+        if len(runners) == 1 or len(mine) < len(runners)
+    ]
+
+
+def _map_scopes(conf, runners: NodeSet) -> list:
+    """[(targets, runners)] from the affinity_map table."""
+    table = conf.clushible.affinity_map or dict()
+    if isinstance(table, SimpleNamespace):
+        table = vars(table)
+    return [
+        (NodeSet(t), NodeSet(r).intersection(runners))
+        for t, r in table.items()
+    ]
+
+
+def target_homes(conf, targets: NodeSet, runners) -> dict:
+    """{home runners: their local targets} per conf.clushible.affinity.
+
+    A target's home is the runners sharing a group with it ('groups') or
+    mapped to it ('map'); the first match wins. Targets with no live home
+    runner are left out, to go to any runner.
+    """
+    runners = NodeSet(runners)
+    if conf.clushible.affinity == "groups":
+        scopes = _group_scopes(conf, runners)
+    elif conf.clushible.affinity == "map":
+        scopes = _map_scopes(conf, runners)
+    else:
+        return dict()
+
+    homes = dict()
+    left = NodeSet(targets)
+    for members, mine in scopes:
+        local = left.intersection(members)
+        if len(mine) == 0 or len(local) == 0:
+            continue
+        home = str(mine)
+        homes.setdefault(home, NodeSet()).update(local)
+        left.difference_update(local)
+
+    return homes
+
+
+def split_local(subtargets: list, homes: dict) -> list:
+    """Cut each subtarget set along homes so no set spans two of them."""
+    local = []
+    for s in subtargets:
+        rest = s.copy()
+        for targets in homes.values():
+            part = rest.intersection(targets)
+            if len(part):
+                local.append(part)
+                rest.difference_update(part)
+        if len(rest):
+            local.append(rest)
+    return local
+
+
+def chunk_homes(chunks: list, homes: dict) -> list:
+    """Home runners of each chunk ("" for any runner).
+
+    Chunks cut by split_local() lie in a single home; their first host
+    tells which.
+    """
+    found = []
+    for c in chunks:
+        first = next(iter(c), None)
+        home = ""
+        for h, targets in homes.items():
+            if first in targets:
+                home = h
+                break
+        found.append(home)
+    return found
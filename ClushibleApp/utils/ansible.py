@@ -1,11 +1,18 @@
 #!/usr/bin/env python3.12
 
 import datetime as dt
+import hashlib
 from pathlib import Path
 
 from ClusterShell.NodeSet import NodeSet, expand
 
 from . import msg
+from .adaptive import sampler_cmd, sampler_stop
+from .events import callback_dir
+from .facts import fact_cache_env
+from .logstore import RUNNER_LOG_DIR
+from .stage import stage_path
+from .transport import runner_path
 
 
 def validate_ansible_setup(conf):
@@ -20,13 +27,14 @@ def validate_ansible_setup(conf):
             f"Ansible project dir '{conf.ansible.project_dir}' does not exist. Exiting."
         )
 
-    if conf.ansible.playbook == "":
+    if not playbooks(conf):
         msg.error("No Ansible playbook specified. Exiting.")
 
-    if not Path(conf.ansible.playbook).is_file():
-        msg.error(
-            f"Ansible playbook file '{conf.ansible.playbook}' does not exist. Exiting."
-        )
+    for playbook in playbooks(conf):
+        if not Path(playbook).is_file():
+            msg.error(
+                f"Ansible playbook file '{playbook}' does not exist. Exiting."
+            )
 
     if not Path(conf.ansible.inventory).exists():
         msg.error(
@@ -39,35 +47,100 @@ def validate_ansible_setup(conf):
         )
 
 
-def generate_playbook_cmd(conf, target: NodeSet, extra_vars: dict = {}):
-    """Generates the Ansible playbook command based on configuration and extra vars."""
+def playbooks(conf) -> list:
+    """Playbooks to run in order (--playbook is comma-separated)."""
+    return [p.strip() for p in conf.ansible.playbook.split(",") if p.strip()]
+
+
+def limit_file(conf, target: NodeSet) -> Path:
+    """Path of the staged Ansible limit file for target."""
+    digest = hashlib.sha1(str(target).encode("utf-8")).hexdigest()[:16]
+    return stage_path(conf) / "limits" / digest
+
+
+def write_limit_files(conf, targets: list) -> None:
+    """Write one Ansible limit file (a host per line) for each target set."""
+    for target in targets:
+        path = limit_file(conf, target)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(expand(target)) + "\n")
+
+
+def generate_playbook_cmd(
+    conf,
+    target: NodeSet,
+    extra_vars: dict = {},
+    forks: int = None,
+    limit: str = None,
+    inventory: list = None,
+    playbook: str = None,
+):
+    """Generates the Ansible playbook command based on configuration and extra vars.
+
+    forks overrides conf.ansible.forks, e.g. to size it for a given runner.
+    limit overrides the inline host list, e.g. with staged @limit files;
+    an empty limit drops -l altogether. inventory overrides
+    conf.ansible.inventory with one or more (sliced) inventories. playbook
+    defaults to the first of --playbook.
+    """
+    if playbook is None:
+        playbook = playbooks(conf)[0]
+    if forks is None:
+        forks = conf.ansible.forks
+    if limit is None:
+        limit = ",".join(expand(target))
+    if inventory is None:
+        inventory = [conf.ansible.inventory]
+    inventory = [runner_path(conf, i) for i in inventory]
+
     now = dt.datetime.now()
     date_str = now.strftime("%Y%m%d-%H%M")
+    # Logs are named by run so gather_logs can find them
+    log_prefix = getattr(conf.clushible, "run_id", date_str)
+
+    # Samples runner load on this command's own stream for the controller
+    sample = conf.clushible.adaptive_forks and not conf.core.dry_run
 
     cmd = [
-        f"cd {conf.ansible.project_dir}; ",
-        "export ANSIBLE_STDOUT_CALLBACK=clushible; ",
-        f"{conf.clushible.mkdir} -p /var/tmp/clushible/;",
-        f"CLUSHIBLE_LOCAL_FILE=$({conf.clushible.mktemp} '/var/tmp/clushible/{date_str}.XXX.log');",
+        f"cd {runner_path(conf, conf.ansible.project_dir)}; ",
+        sampler_cmd(conf.clushible.sample_interval) if sample else "",
+        # Keep any callback plugins the runner's environment already adds
+        "export ANSIBLE_STDOUT_CALLBACK=clushible",
+        "ANSIBLE_CALLBACK_PLUGINS=${ANSIBLE_CALLBACK_PLUGINS:+$ANSIBLE_CALLBACK_PLUGINS:}"
+        f"{callback_dir(conf)}; ",
+        fact_cache_env(conf),
+        f"{conf.clushible.mkdir} -p {RUNNER_LOG_DIR}/;",
+        f"CLUSHIBLE_LOCAL_FILE=$({conf.clushible.mktemp} '{RUNNER_LOG_DIR}/{log_prefix}.XXX.log');",
+        # ansible-playbook's status comes back around the tee on fd 3 (a
+        # plain sh has no pipefail) so runner failures are still seen
+        "exec 4>&1; rc=$( { {",
         f"{conf.clushible.echo}" if conf.core.dry_run else "",
         conf.ansible.playbook_cmd,
-        f"-i {conf.ansible.inventory}",
-        f"--forks {str(conf.ansible.forks)}",
-        f"--vault-password-file {conf.ansible.vault_password_file}",
+        " ".join(f"-i {i}" for i in inventory),
+        f"--forks {str(forks)}",
+        f"--vault-password-file {runner_path(conf, conf.ansible.vault_password_file)}",
         "-C" if conf.ansible.check else "",
-        f"-l {','.join(expand(target))}",  # ",".join(expand(target)),
+        f"-l {limit}" if limit else "",
         f"--tags={conf.ansible.tags}" if conf.ansible.tags else "",
-        f"--skip-tags={conf.ansible.skip_tags}"
-        if conf.ansible.skip_tags
-        else "",
-        str(conf.ansible.playbook),
+        (
+            f"--skip-tags={conf.ansible.skip_tags}"
+            if conf.ansible.skip_tags
+            else ""
+        ),
+        runner_path(conf, playbook),
     ]
 
     for k, v in extra_vars.items():
         cmd.extend(["--extra-vars", f"{k}={v}"])
 
     # Append a final tee
-    cmd.append(" | /usr/bin/tee ${CLUSHIBLE_LOCAL_FILE}")
+    cmd.append(
+        "3>&-; echo $? >&3; } | /usr/bin/tee ${CLUSHIBLE_LOCAL_FILE} >&4; }"
+        " 3>&1 ); exec 4>&-;"
+    )
+    if sample:
+        cmd.append(sampler_stop())
+    cmd.append("exit $rc")
     final_cmd_str = " ".join(cmd)
 
     if conf.core.verbose > 1:
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3.12
+import sys
+import threading
+
+from ClusterShell.NodeSet import NodeSet, NodeSetParseError
+
+from .events import parse_line
+
+
+class Collator:
+    """Online clubak-style collator for per-host output.
+
+    Lines are folded in as they arrive into one NodeSet per distinct
+    message, keeping the order in which messages were first seen. Repeated
+    messages are interned so each distinct message is stored once, and the
+    collated output can be rendered at any moment.
+    """
+
+    def __init__(self, header: bool = True):
+        self.header = header
+        self._groups = dict()  # message -> NodeSet, first-seen order
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._groups)
+
+    def add(self, node: str, info: str) -> None:
+        """Add a single node/message pair."""
+        info = sys.intern(info)
+        with self._lock:
+            nodeset = self._groups.get(info)
+            if nodeset is None:
+                self._groups[info] = NodeSet(node)
+            else:
+                nodeset.update(node)
+
+    def add_line(self, line: str) -> None:
+        """Add an output line (callback record or "node: message")."""
+        event = parse_line(line)
+        if event is None or event.host is None:
+            return
+
+        try:
+            self.add(event.host, event.text())
+        except NodeSetParseError:
+            pass
+
+    def feed(self, buf: bytes) -> None:
+        """Add every line of a raw output buffer."""
+        for line in buf.decode("utf-8", errors="replace").split("\n"):
+            self.add_line(line)
+
+    def render(self) -> str:
+        """Render the collated output seen so far."""
+        with self._lock:
+            groups = [(i, ns.copy()) for i, ns in self._groups.items()]
+
+        coll_results = []
+        for info, nodeset in groups:
+            if self.header:
+                coll_results.append(f"{nodeset}: {info}")
+            else:
+                # Format with separator lines
+                separator = "-" * 15
+                coll_results.append(separator)
+                coll_results.append(f"{nodeset} ({len(nodeset)})")
+                coll_results.append(separator)
+                coll_results.append(info)
+                coll_results.append("")
+
+        return "\n".join(coll_results)
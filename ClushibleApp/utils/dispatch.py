@@ -1,36 +1,98 @@
 #!/usr/bin/env python3.12
+import collections
+import math
 import os
+import sys
 import time
 
-import threading
-from concurrent.futures.thread import ThreadPoolExecutor
-from concurrent.futures import as_completed
+from dataclasses import dataclass
 
-from ClusterShell.NodeSet import NodeSet
-from ClusterShell.Task import Task, task_self
+from ClusterShell.Event import EventHandler
+from ClusterShell.NodeSet import NodeSet, NodeSetParseError
+from ClusterShell.Task import task_self
 
 from . import msg
-
-
-def get_runner_procs(conf):
-    nproc_cmd = "/usr/bin/nproc"
+from .collate import Collator
+from .events import parse_line
+from .adaptive import LOAD_RECORD, ForksController
+from .affinity import chunk_homes, target_homes
+from .history import recommended_forks, record_forks, record_runtimes
+from .telemetry import timer
+from .report import Report
+from .inventory import slice_file
+from .ansible import generate_playbook_cmd, limit_file, playbooks
+from .rolling import Rollout, parse_cap
+from .tree import nested_cmd
+
+# Target number of chunks each runner pulls when chunks is auto (0)
+CHUNKS_PER_RUNNER = 4
+
+# ssh exit status when the connection to a runner fails or drops
+SSH_FAILURE_RC = 255
+
+# Memory set aside per Ansible fork when sizing forks from runner capacity
+FORK_MEM_KB = 100 * 1024
+
+
+@dataclass
+class RunnerCapacity:
+    """Capacity of a runner as reported by the probe."""
+
+    cores: int
+    mem_kb: int = 0
+    load: float = 0.0
+
+    def forks(self, fscale: int) -> int:
+        """Forks this runner can sustain.
+
+        Scales the cores not already busy (by load average) and caps the
+        result by available memory.
+        """
+        forks = int(fscale * max(self.cores - self.load, 1))
+        if self.mem_kb:
+            forks = min(forks, self.mem_kb // FORK_MEM_KB)
+        return max(forks, 1)
+
+
+def _parse_capacity(out: str) -> RunnerCapacity:
+    fields = out.split()
+    cap = RunnerCapacity(int(fields[0]))
+    try:
+        cap.mem_kb = int(fields[1])
+        cap.load = float(fields[2])
+    except (IndexError, ValueError):
+        pass
+    return cap
+
+
+def get_runner_capacity(conf) -> dict:
+    """Probe cores, available memory and load on runners in one round-trip."""
+    probe_cmd = (
+        "/usr/bin/nproc;"
+        " /usr/bin/awk '/^MemAvailable:/ {print $2}' /proc/meminfo;"
+        " /usr/bin/cut -d' ' -f1 /proc/loadavg"
+    )
     conf.clushible.echo = "/usr/bin/echo"
     conf.clushible.mkdir = "/usr/bin/mkdir"
     conf.clushible.mktemp = "/usr/bin/mktemp"
 
     if os.uname().sysname == "Darwin":
-        nproc_cmd = "/usr/sbin/sysctl -n hw.ncpu"
+        probe_cmd = (
+            "/usr/sbin/sysctl -n hw.ncpu;"
+            " echo $(( $(/usr/sbin/sysctl -n hw.memsize) / 1024 ));"
+            " /usr/sbin/sysctl -n vm.loadavg | /usr/bin/awk '{print $2}'"
+        )
         conf.clushible.echo = "/bin/echo"
         conf.clushible.mkdir = "/bin/mkdir"
         conf.clushible.mktemp = "/usr/bin/mktemp"
 
     runners = NodeSet(conf.clushible.runners)
     R = task_self()
-    R.run(nproc_cmd, nodes=conf.clushible.runners)
+    R.run(probe_cmd, nodes=conf.clushible.runners)
     for rc, nodelist in R.iter_retcodes():
         n = NodeSet.fromlist(nodelist)
         if conf.core.verbose > 0:
-            msg.info(f"Runner Nodeset: {n}, nproc return code: {rc}")
+            msg.info(f"Runner Nodeset: {n}, probe return code: {rc}")
 
         if rc != 0:
             runners.remove(n)
@@ -39,129 +101,649 @@ def get_runner_procs(conf):
             )
 
     conf.clushible.runners = str(runners)
-    rprocs = {}
+    rcaps = {}
 
     for b, nodelist in R.iter_buffers(match_keys=runners):
-        out = int(b.message().decode("utf-8"))
+        cap = _parse_capacity(b.message().decode("utf-8"))
         for n in nodelist:
-            rprocs[n] = out
+            rcaps[n] = cap
 
     if conf.core.verbose > 0:
-        msg.info(f"Max runner proc: {max(rprocs.values())}")
-        msg.info(f"Min runner proc: {min(rprocs.values())}")
+        for r, cap in rcaps.items():
+            msg.info(
+                f"Runner {r}: cores={cap.cores} mem_kb={cap.mem_kb} load={cap.load}"
+            )
         if conf.core.verbose > 1:
             msg.info(
-                f"Recommended forks = {conf.clushible.fscale * min(rprocs.values())}"
+                f"Recommended forks = {min(c.forks(conf.clushible.fscale) for c in rcaps.values())}"
             )
 
-    return rprocs
+    return rcaps
 
 
-def run_task(conf, cmd, t2r: dict):
-    th = threading.current_thread()
-    thi = th.ident
+def get_runner_forks(conf, rcaps: dict) -> dict:
+    """Forks for each runner; a fixed forks setting applies to all.
 
-    # Create ClusterShell Tasks w/ thread
-    t = Task(th)
+    With --adaptive-forks, runners start from the forks their last run
+    settled on.
+    """
+    if conf.ansible.forks != 0:
+        return {r: conf.ansible.forks for r in rcaps}
+    forks = {r: c.forks(conf.clushible.fscale) for r, c in rcaps.items()}
+    if conf.clushible.adaptive_forks:
+        recommended = recommended_forks(conf)
+        forks.update((r, f) for r, f in recommended.items() if r in forks)
+    return forks
+
+
+def chunk_subtargets(conf, subtargets: list, nrunners: int) -> list:
+    """Cut partitioned subtargets into smaller chunks for the work queue."""
+    nchunks = conf.clushible.chunks
+    if nchunks == 0:
+        if conf.clushible.distribution in {"pack", "balanced"}:
+            # Pack fills forks on as few runners as possible and balanced
+            # sets are already cost-equalized; leave them be.
+            nchunks = 1
+        else:
+            nchunks = math.ceil(
+                CHUNKS_PER_RUNNER * nrunners / max(len(subtargets), 1)
+            )
+
+    chunks = []
+    for s in subtargets:
+        chunks.extend(x for x in s.split(min(nchunks, len(s))) if len(x))
 
-    # print(t2r)
-    runner = t2r[thi]
-    print("")
     if conf.core.verbose > 0:
-        print(f":: {runner}: {cmd}\n")
-    # msg.info(f"{runner}({thn} {thi}): {cmd}")
-    t.run(cmd, nodes=runner)
-    t.join()
-    return t.node_buffer(runner)
-    # return t.max_retcode()
-
-
-def check_thread():
-    # ThreadPoolExecutgor creates lazy, make it force via sleep. FIX ME
-    # th = threading.current_thread()
-    time.sleep(0.2)
-
-
-def run(conf, cmds: list):
-    r_ns = NodeSet(conf.clushible.runners)
-
-    grange = [i for i in range(len(r_ns))]
-    thread_to_runner = dict()
-    pool_size = len(r_ns)
-    with ThreadPoolExecutor(max_workers=pool_size) as executor:
-        main_th = threading.current_thread()
-        # print(f"Main Thread: {main_th.ident}")
-        ch = []
-        for i in grange:
-            ch.append(executor.submit(check_thread))
-        for r in as_completed(ch):
-            r.result()
-
-        # Create a map thread_to_runner[th.ident] = runner
-        r_list = list(r_ns)
-        for i in threading.enumerate():
-            if main_th == i:
-                continue
-            thread_to_runner[i.ident] = r_list.pop(0)
-            # print(thread_to_runner)
-
-        # msg.info(f"{thread_to_runner}")
-
-        rcs = []
-        for c in cmds:
-            rcs.append(executor.submit(run_task, conf, c, thread_to_runner))
-
-        results = []
-        for r in as_completed(rcs):
-            results.append(r.result())
-
-        # for r in results:
-        #    print(r.decode('utf-8'))
-
-    if conf.clushible.collate is True:
-        return collate_results(conf, results)
-    return results
-
-
-# I think this will lose it's sorted order :/ maybe
+        msg.info(
+            f"Number of chunks: {len(chunks)} ({nchunks} per subtarget set)"
+        )
+
+    return chunks
+
+
+class DispatchState:
+    """Work-queue bookkeeping shared by the runner handlers.
+
+    Tracks chunks in flight so idle runners can be woken if work is handed
+    back by a runner that dies, and records dead runners.
+
+    Chunks wait in one queue per home (the runners local to them, "" for
+    any runner; see --affinity). A runner pulls from its own homes first,
+    then from "", and only then spills over to a home whose live runners
+    are all busy.
+    """
+
+    def __init__(self, chunks: list, homes: list = None):
+        homes = homes or [""] * len(chunks)
+        self.queues = dict()  # home -> deque of queued chunks
+        for i, (c, home) in enumerate(zip(chunks, homes)):
+            # (chunk id, hosts, limit/inventory artifacts were staged,
+            #  index of the playbook to run next)
+            self.queues.setdefault(home, collections.deque()).append(
+                (i, c, True, 0)
+            )
+        self.members = {h: NodeSet(h) for h in self.queues}
+        self.home = dict(enumerate(homes))  # chunk id -> home
+        self.next_id = len(chunks)
+        self.inflight = 0
+        self.busy = set()  # runners with a chunk running
+        self.dead = dict()  # runner -> reason
+        self.idle = []  # handlers waiting for work
+
+    def pending(self) -> int:
+        """Chunks still queued."""
+        return sum(len(q) for q in self.queues.values())
+
+    def _queue_for(self, runner: str):
+        """Home whose queue runner should pull from next, or None."""
+
+        def hosts(h):
+            return sum(len(c) for _, c, _, _ in self.queues[h])
+
+        waiting = [h for h, q in self.queues.items() if q]
+        if runner is not None:
+            local = [h for h in waiting if h and runner in self.members[h]]
+            if local:
+                return max(local, key=hosts)
+        if "" in waiting:
+            return ""
+
+        def overloaded(h):
+            alive = [r for r in self.members[h] if r not in self.dead]
+            return all(r in self.busy for r in alive)
+
+        spill = [h for h in waiting if overloaded(h)]
+        return max(spill, key=hosts) if spill else None
+
+    def pull(
+        self,
+        batch: int,
+        max_hosts: int = None,
+        runner: str = None,
+        fill: int = None,
+    ) -> list:
+        """Up to batch chunks at the same stage from the front of a queue.
+
+        With max_hosts, no more than that many hosts are taken; a chunk
+        that doesn't fit is split and its remainder stays at the front.
+        With fill, whole chunks are taken while they fit in fill hosts
+        (always at least one).
+        """
+        home = self._queue_for(runner)
+        if home is None:
+            return []
+        work = self.queues[home]
+
+        pulled = []
+        hosts = 0
+        while work and len(pulled) < batch:
+            if pulled and work[0][3] != pulled[0][3]:
+                break
+            if max_hosts is not None and hosts >= max_hosts:
+                break
+            if fill is not None and pulled and hosts + len(work[0][1]) > fill:
+                break
+            i, c, staged, stage = work.popleft()
+            if max_hosts is not None and hosts + len(c) > max_hosts:
+                take = NodeSet.fromlist(list(c)[: max_hosts - hosts])
+                work.appendleft((i, c.difference(take), False, stage))
+                i, c, staged = self.next_id, take, False
+                self.home[i] = home
+                self.next_id += 1
+            pulled.append((i, c, staged, stage))
+            hosts += len(c)
+        if pulled:
+            self.inflight += 1
+        return pulled
+
+    def done(
+        self,
+        runner: str = None,
+        reason: str = None,
+        requeue=None,
+        stage=0,
+        chunk_id=None,
+    ):
+        """Finish a pull, optionally marking runner dead and re-queuing.
+
+        Re-queued hosts go back to the home of chunk_id.
+        """
+        if runner is not None:
+            self.dead[runner] = reason
+            self.busy.discard(runner)
+        if requeue is not None and len(requeue) > 0:
+            home = self.home.get(chunk_id, "")
+            self.queues[home].append((self.next_id, requeue, False, stage))
+            self.home[self.next_id] = home
+            self.next_id += 1
+        self.inflight -= 1
+
+    def orphaned(self) -> NodeSet:
+        """Hosts still queued (no runner left to take them)."""
+        orphans = NodeSet()
+        for work in self.queues.values():
+            for _, c, _, _ in work:
+                orphans.update(c)
+            work.clear()
+        return orphans
+
+
+class RunnerHandler(EventHandler):
+    """Drives one runner from the shared task's event loop.
+
+    Each time the runner's worker closes, the next chunk is pulled from the
+    work queue and started on it. Output lines are handled as they arrive
+    (streamed to the terminal and sink, folded into the collator/report)
+    rather than buffered. If the runner times out or loses its connection
+    it is marked dead and the chunk's hosts without a PLAY RECAP are
+    re-queued for the others.
+
+    With several playbooks, a chunk that finishes one goes straight on to
+    the next on the same runner, minus its failed hosts, so it never waits
+    for other chunks.
+    """
+
+    def __init__(self, run, runner: str):
+        self.run = run
+        self.runner = runner
+        self.conf = run.conf
+
+        # Each pull takes whole chunks up to the runner's forks, so larger
+        # runners take more and no pull leaves forks idle.
+        self.forks = self.conf.clushible.runner_forks.get(
+            runner, self.conf.ansible.forks
+        )
+
+        self.chunk_id = None
+        self.chunk = None
+        self.pulled = None
+        self.stage = 0
+        self.start = None
+        self.batch_start = None  # when the chunk's first playbook started
+        self.task_start = None  # when the running task started
+        self.task_done = []  # times of the running task's results
+        self.rc = None
+        self.buffer = []
+        self.nbytes = 0
+
+    def start_next(self, pulled: list = None) -> None:
+        """Start pulled (the next stage of this runner's chunk) or a pull."""
+        conf = self.conf
+        state = self.run.state
+        rollout = self.run.rollout
+        if pulled is not None:
+            state.inflight += 1
+        elif rollout is None:
+            pulled = state.pull(
+                self.forks, runner=self.runner, fill=self.forks
+            )
+        elif rollout.allowance() > 0:
+            # The host budget sizes the pull, up to what forks can run
+            allowance = min(rollout.allowance(), self.forks)
+            pulled = state.pull(allowance, allowance, self.runner)
+            self.batch_start = time.monotonic()
+        if not pulled:
+            # Others may still hand work back, free up the in-flight
+            # budget or get busy enough to spill over; wait to be woken
+            state.busy.discard(self.runner)
+            state.idle.append(self)
+            return
+        state.busy.add(self.runner)
+
+        self.pulled = pulled
+        self.chunk_id = pulled[0][0]
+        self.stage = pulled[0][3]
+        self.chunk = NodeSet.fromlist([c for _, c, _, _ in pulled])
+        if rollout is not None:
+            rollout.started(len(self.chunk))
+        limit = None
+        inventory = None
+        # Re-queued remainders have no staged artifacts; they go inline
+        staged = all(s for _, _, s, _ in pulled)
+        if staged and conf.clushible.slice_inventory:
+            # Slices only hold the chunk's hosts; no limit needed
+            inventory = [slice_file(conf, c) for _, c, _, _ in pulled]
+            limit = ""
+        elif staged and conf.clushible.limit == "file":
+            limit = ",".join(
+                f"@{limit_file(conf, c)}" for _, c, _, _ in pulled
+            )
+        with timer(conf, "command_generation"):
+            if getattr(conf.clushible, "tree_leaves", None):
+                cmd = nested_cmd(conf, self.chunk, self.runner)
+            else:
+                cmd = generate_playbook_cmd(
+                    conf,
+                    self.chunk,
+                    forks=self.forks,
+                    limit=limit,
+                    inventory=inventory,
+                    playbook=self.run.playbooks[self.stage],
+                )
+        print("")
+        if conf.core.verbose > 0:
+            ids = "+".join(str(i) for i, _, _, _ in pulled)
+            if len(self.run.playbooks) > 1:
+                ids += f" playbook {self.stage + 1}/{len(self.run.playbooks)}"
+            print(f":: {self.runner} [chunk {ids}]: {cmd}\n")
+
+        self.rc = None
+        self.buffer = []
+        self.nbytes = 0
+        self.start = time.monotonic()
+        self.task_start = self.start
+        self.task_done = []
+        self.run.timing[(self.chunk_id, self.stage)] = [
+            self.chunk,
+            self.forks,
+            self.start,
+            None,
+            dict(),
+        ]
+        self.run.task.shell(
+            cmd,
+            nodes=self.runner,
+            handler=self,
+            timeout=conf.clushible.runner_timeout or None,
+        )
+
+    def ev_read(self, worker, node, sname, msg):
+        self.nbytes += len(msg) + 1
+        conf = self.conf
+        nested = conf.clushible.relay or getattr(
+            conf.clushible, "tree_leaves", None
+        )
+        if sname == worker.SNAME_STDERR and nested:
+            # Stays off the record stream, naming where it came from
+            text = msg.decode("utf-8", errors="replace")
+            sys.stderr.write(f"{self.runner}: {text}\n")
+            sys.stderr.flush()
+            return
+        self.run.line(self, msg)
+
+    def ev_hup(self, worker, node, rc):
+        self.rc = rc
+
+    def ev_close(self, worker, timedout):
+        run = self.run
+        if self.buffer:
+            run.results.append(b"\n".join(self.buffer))
+            self.buffer = []
+
+        reason = None
+        if timedout:
+            reason = f"timed out after {self.conf.clushible.runner_timeout}s"
+        elif self.rc is None:
+            reason = "no return code"
+        elif self.rc == SSH_FAILURE_RC:
+            reason = f"lost connection (RC {self.rc})"
+
+        telemetry = getattr(self.conf.clushible, "telemetry", None)
+        if telemetry is not None:
+            telemetry.chunk(
+                self.chunk_id,
+                self.runner,
+                len(self.chunk),
+                self.start,
+                time.monotonic(),
+                self.nbytes,
+                self.rc,
+            )
+
+        if run.rollout is not None:
+            run.rollout.released(len(self.chunk))
+
+        if reason is None:
+            run.timing[(self.chunk_id, self.stage)][3] = time.monotonic()
+            run.state.done()
+            if run.forks_ctl is not None:
+                self.forks = run.forks_ctl.next_forks(
+                    self.runner, len(self.chunk)
+                )
+            follow = self.next_stage()
+            if run.rollout is not None:
+                self.rolled(follow)
+            self.start_next(follow)
+            if run.rollout is not None:
+                # Finished hosts freed up some of the in-flight budget
+                run.wake_idle()
+            return
+
+        unfinished = self.chunk.difference(
+            run.report.reported_since(self.start)
+        )
+        msg.warn(
+            f"Runner {self.runner} {reason}; re-queuing {unfinished} ({len(unfinished)})."
+        )
+        run.report.runner_failed(self.runner, reason, unfinished)
+        run.state.done(
+            self.runner, reason, unfinished, self.stage, self.chunk_id
+        )
+
+        # Wake idle runners to take the re-queued hosts
+        run.wake_idle()
+
+    def rolled(self, follow) -> None:
+        """Account hosts done with all their playbooks to the rollout."""
+        run = self.run
+        done = self.chunk.copy()
+        for _, c, _, _ in follow or ():
+            done.difference_update(c)
+        if len(done) == 0:
+            return
+
+        failed = done.difference(run.report.reported_since(self.start))
+        failed.update(
+            done.intersection(run.report.hosts("failed", "unreachable"))
+        )
+        if self.conf.core.dry_run:
+            failed = NodeSet()
+        run.rollout.finished(
+            len(done), len(failed), time.monotonic() - self.batch_start
+        )
+        # Recorded even with nothing left queued, so retries don't re-run
+        # an aborted rollout
+        if run.rollout.aborted and run.report.abort_reason is None:
+            run.abort(run.rollout.aborted)
+
+    def next_stage(self):
+        """The chunk's next playbook for its surviving hosts, else None.
+
+        Hosts that failed, were unreachable or never reported a recap
+        (e.g. the playbook aborted) don't go on.
+        """
+        stage = self.stage + 1
+        if stage >= len(self.run.playbooks):
+            return None
+        if self.conf.core.dry_run:
+            return [(i, c, s, stage) for i, c, s, _ in self.pulled]
+
+        report = self.run.report
+        survivors = self.chunk.intersection(report.reported_since(self.start))
+        survivors.difference_update(report.hosts("failed", "unreachable"))
+        if len(survivors) == 0:
+            return None
+        if len(survivors) == len(self.chunk):
+            # Staged limit files and slices still match
+            return [(i, c, s, stage) for i, c, s, _ in self.pulled]
+        dropped = self.chunk.difference(survivors)
+        msg.warn(f"Dropping {dropped} ({len(dropped)}) from later playbooks.")
+        return [(self.chunk_id, survivors, False, stage)]
+
+
+class Run:
+    """One dispatch of chunks over all runners on a single event loop."""
+
+    def __init__(self, conf, chunks: list, sink=None, report=None):
+        self.conf = conf
+        self.sink = sink
+        self.report = report if report is not None else Report()
+        homes = None
+        if conf.clushible.affinity:
+            homes = chunk_homes(
+                chunks,
+                target_homes(
+                    conf, NodeSet.fromlist(chunks), conf.clushible.runners
+                ),
+            )
+        self.state = DispatchState(chunks, homes)
+        self.task = task_self()
+        self.results = []
+
+        self.collator = None
+        if conf.clushible.collate is True and not conf.clushible.relay:
+            self.collator = Collator(conf.clushible.coll_header)
+
+        # (chunk_id, stage) -> [hosts, forks, start, end, {host: seconds}]
+        self.timing = dict()
+
+        # --tree-nested gateways run the whole list themselves
+        self.playbooks = playbooks(conf)
+        if getattr(conf.clushible, "tree_leaves", None):
+            self.playbooks = self.playbooks[:1]
+
+        # --adaptive-forks retunes each runner's forks between chunks
+        self.forks_ctl = None
+        if conf.clushible.adaptive_forks:
+            self.forks_ctl = ForksController(
+                conf.clushible.runner_forks, FORK_MEM_KB
+            )
+
+        # Rolling mode caps hosts in flight over all runners
+        self.rollout = None
+        total = sum(len(c) for c in chunks)
+        cap = parse_cap(conf.clushible.max_inflight, total)
+        if cap:
+            self.rollout = Rollout(cap, conf.clushible.max_fail_pct)
+
+    def wake_idle(self) -> None:
+        """Have idle runners try the queue again."""
+        idle, self.state.idle = self.state.idle, []
+        for handler in idle:
+            handler.start_next()
+
+    def abort(self, reason: str) -> None:
+        """Drop all queued work; what is in flight runs to completion."""
+        hosts = self.state.orphaned()
+        if len(hosts):
+            msg.warn(
+                f"Rollout aborted, {reason}; {hosts} ({len(hosts)}) not run."
+            )
+        else:
+            msg.warn(f"Rollout aborted, {reason}.")
+        self.report.abort(hosts, reason)
+
+    def line(self, handler: RunnerHandler, raw: bytes) -> None:
+        """Handle one line of output from a runner as it arrives."""
+        conf = self.conf
+        line = raw.decode("utf-8", errors="replace")
+        if line.startswith(LOAD_RECORD):
+            if self.forks_ctl is not None:
+                self.forks_ctl.sample(handler.runner, line)
+            return
+        event = parse_line(line)
+        if event is not None and line.startswith("{"):
+            # Callback records are shown in their human-readable form
+            raw = event.line().encode("utf-8")
+        if conf.clushible.relay:
+            # Records go up to the parent clushible as they came; main()
+            # has pointed sys.stdout (messages) at stderr
+            sys.__stdout__.write(f"{line}\n")
+            sys.__stdout__.flush()
+        elif conf.clushible.stream:
+            text = raw.decode("utf-8", errors="replace")
+            sys.stdout.write(f"{handler.runner}[{handler.chunk_id}]: {text}\n")
+            sys.stdout.flush()
+        elif self.collator is None:
+            handler.buffer.append(raw)
+
+        if event is not None and event.host is not None:
+            if self.collator is not None:
+                try:
+                    self.collator.add(event.host, event.text())
+                except NodeSetParseError:
+                    pass
+            self.report.add_event(event)
+
+            # PLAY RECAP records all come at the very end; don't time on them
+            if event.status != "recap":
+                self.seen(handler, event.host)
+        elif event is not None and event.status == "task":
+            handler.task_start = time.monotonic()
+            handler.task_done = []
+
+        if self.sink is not None:
+            self.sink(handler.runner, handler.chunk_id, line)
+
+    def seen(self, handler: RunnerHandler, host: str) -> None:
+        """Time a task result of host in handler's chunk.
+
+        Ansible hands hosts in order to forks as they free up, so the n-th
+        result of a task started when the (n - forks)-th came in (or with
+        the task); the wait for a fork isn't the host's.
+        """
+        try:
+            if host not in handler.chunk:
+                return
+        except NodeSetParseError:
+            return
+        now = time.monotonic()
+        done = handler.task_done
+        n = len(done)
+        began = done[n - handler.forks] if n >= handler.forks else None
+        done.append(now)
+        elapsed = now - (began or handler.task_start)
+        results = self.timing[(handler.chunk_id, handler.stage)][4]
+        results[host] = results.get(host, 0.0) + elapsed
+
+    def execute(self):
+        r_ns = NodeSet(self.conf.clushible.runners)
+        t = self.task
+
+        # Lines are handled as they arrive; don't keep them in the task's
+        # message trees so memory stays flat regardless of run length.
+        t.set_default("stdout_msgtree", False)
+        t.set_default("stderr_msgtree", False)
+        # Gateways' and runners' stderr (warnings) is kept apart from the
+        # records on stdout rather than merged into them
+        stderr = t.default("stderr")
+        t.set_default("stderr", True)
+        if len(r_ns) > t.info("fanout"):
+            t.set_info("fanout", len(r_ns))
+
+        for r in r_ns:
+            RunnerHandler(self, r).start_next()
+        # Runners that found no local work before the others got busy may
+        # spill over now
+        self.wake_idle()
+        t.resume()
+
+        # Later probes and copies on this task read their output back
+        t.set_default("stdout_msgtree", True)
+        t.set_default("stderr_msgtree", True)
+        t.set_default("stderr", stderr)
+
+        # Drop dead runners for anything dispatched after this (e.g. retries)
+        if self.state.dead:
+            r_ns.difference_update(",".join(self.state.dead))
+            self.conf.clushible.runners = str(r_ns)
+
+        # Everything left in the queue had no surviving runner to go to
+        orphans = self.state.orphaned()
+        if len(orphans) > 0:
+            msg.warn(f"No runners left; {orphans} ({len(orphans)}) not run.")
+            self.report.orphaned(orphans)
+
+        record_runtimes(self.conf, host_runtimes(self.conf, self.timing))
+        if self.forks_ctl is not None:
+            # Only forks runners were seen coping with are kept
+            forks = self.forks_ctl.validated
+            if self.conf.core.verbose > 0:
+                msg.info(f"Adaptive forks settled on {forks}")
+            if forks:
+                record_forks(self.conf, forks)
+
+        if self.collator is not None:
+            with timer(self.conf, "collation"):
+                return self.collator.render()
+        if self.conf.clushible.stream:
+            # Output has already been emitted line by line
+            return None
+        return self.results
+
+
+def host_runtimes(conf, timing: dict) -> dict:
+    """Estimate per-host elapsed time for the chunks that ran.
+
+    Hosts are timed from their task results (see Run.seen). Hosts without
+    any get the chunk's wall time, scaled down when the chunk was larger
+    than forks and so ran in several waves. A host's playbooks add up.
+    """
+    runtimes = dict()
+    for chunk, forks, start, end, results in timing.values():
+        if end is None:
+            continue
+        waves = max(len(chunk) / max(forks, 1), 1)
+        for host in chunk:
+            elapsed = results.get(host)
+            if elapsed is None:
+                elapsed = (end - start) / waves
+            runtimes[host] = runtimes.get(host, 0.0) + elapsed
+    return runtimes
+
+
+def run(conf, chunks: list, sink=None, report=None):
+    """Dispatch chunks over the runners from a single ClusterShell task.
+
+    Runners pull the next chunk as soon as they are done with the previous
+    one so a slow chunk doesn't hold up the rest.
+    """
+    return Run(conf, chunks, sink, report).execute()
+
+
 def collate_results(conf, results):
-    output_dict = dict()
+    """Collate a list of raw runner output buffers pdsh/clubak style."""
+    collator = Collator(conf.clushible.coll_header)
     for r in results:
-        data = r.decode("utf-8").split("\n")
-        for line in data:
-            if ":" not in line:
-                continue
-
-            node, info = line.split(":", 1)
-            node = node.strip()
-            info = info.strip()
-
-            if info not in output_dict:
-                output_dict[info] = []
-            output_dict[info].append(node)
-
-    # collapsed_common = dict()
-    # for k,v in output_dict.items():
-    #    print(f"{k} --> {v}")
-    #    if v not in collapsed_common.values():
-    #        collapsed_common[v] = []
-    #    collapsed_common[v].append(k)
-    # print(collapsed_common)
-
-    coll_results = []
-    for info, nodes in output_dict.items():
-        nodeset = NodeSet.fromlist(nodes)
-
-        if conf.clushible.coll_header:
-            coll_results.append(f"{nodeset}: {info}")
-        else:
-            # Format with separator lines
-            separator = "-" * 15
-            coll_results.append(separator)
-            coll_results.append(f"{nodeset} ({len(nodeset)})")
-            coll_results.append(separator)
-            coll_results.append(info)
-            coll_results.append("")
-
-    # print('\n'.join(coll_results))
-    return "\n".join(coll_results)
+        collator.feed(r)
+    return collator.render()
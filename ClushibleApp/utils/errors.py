@@ -0,0 +1,5 @@
+#!/usr/bin/env python3.12
+
+
+class ClushibleError(Exception):
+    """Raised when Clushible cannot plan or dispatch a run."""
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3.12
+import json
+import shutil
+import sys
+from pathlib import Path
+
+from ClusterShell.NodeSet import NodeSet, NodeSetParseError
+
+from .stage import stage_path
+
+# Shipped stdout callback emitting the JSON lines parsed below
+CALLBACK_DIR = Path(__file__).parent.parent / "ansible_plugins" / "callback"
+
+# Recap counters in severity order and how summarize() names them
+RECAP_COUNTERS = (
+    ("unreachable", "unreachable"),
+    ("failed", "failures"),
+    ("changed", "changed"),
+    ("ok", "ok"),
+)
+
+
+class HostEvent:
+    """One record from runner output.
+
+    status is a task result (ok, changed, failed, unreachable, skipped,
+    ignored), "recap" (counts hold the PLAY RECAP counters), "text" for
+    plain "host: message" lines, or "task" for a task start (no host).
+    """
+
+    __slots__ = ("host", "status", "task", "msg", "counts")
+
+    def __init__(self, host, status, task="", msg="", counts=None):
+        self.host = host
+        self.status = status
+        self.task = task
+        self.msg = msg
+        self.counts = counts
+
+    def __repr__(self):
+        return f"HostEvent({self.host!r}, {self.status!r}, {self.task!r})"
+
+    def line(self) -> str:
+        """Human-readable "host: message" form."""
+        if self.host is None:
+            return self.text()
+        return f"{self.host}: {self.text()}"
+
+    def final_status(self) -> str:
+        """Most severe non-zero recap counter (recap events only)."""
+        for status, key in RECAP_COUNTERS:
+            if self.counts.get(key, 0) > 0:
+                return status
+        return "ok"
+
+    def text(self) -> str:
+        """Message part of the line as collated and printed."""
+        if self.status == "recap":
+            c = self.counts
+            return (
+                f"ok={c.get('ok', 0)} changed={c.get('changed', 0)}"
+                f" unreachable={c.get('unreachable', 0)}"
+                f" failed={c.get('failures', 0)}"
+                f" skipped={c.get('skipped', 0)}"
+            )
+        if self.status == "text":
+            return self.msg
+        if self.status == "task":
+            return f"TASK [{self.task}]"
+        text = f"{self.status}: {self.task}"
+        return f"{text} - {self.msg}" if self.msg else text
+
+
+def _parse_json(line: str):
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+    if record.get("e") == "task":
+        return HostEvent(None, "task", sys.intern(record.get("t", "")))
+    if "h" not in record:
+        return None
+
+    host = sys.intern(str(record["h"]))
+    status = sys.intern(record.get("e", ""))
+    if status == "recap":
+        counts = {k: v for k, v in record.items() if k not in {"e", "h"}}
+        return HostEvent(host, status, counts=counts)
+    return HostEvent(
+        host, status, sys.intern(record.get("t", "")), record.get("m", "")
+    )
+
+
+def _parse_text(line: str):
+    """Fallback for plain "host: message" lines (other callbacks)."""
+    if ":" not in line:
+        return None
+    node, info = line.split(":", 1)
+    node = node.strip()
+    if not node or " " in node:
+        return None
+    try:
+        NodeSet(node)
+    except NodeSetParseError:
+        return None
+
+    info = info.strip()
+    if info.startswith("ok="):
+        counts = dict()
+        for field in info.split():
+            k, _, v = field.partition("=")
+            if v.isdigit():
+                counts["failures" if k == "failed" else k] = int(v)
+        return HostEvent(sys.intern(node), "recap", counts=counts)
+    return HostEvent(sys.intern(node), "text", msg=info)
+
+
+def parse_line(line: str):
+    """HostEvent for a line of runner output, or None if it is not one.
+
+    host is a single host for callback records but, for text lines, may be
+    a nodeset (e.g. already collated output).
+    """
+    if line.startswith("{"):
+        return _parse_json(line)
+    return _parse_text(line)
+
+
+def callback_dir(conf) -> Path:
+    """Runner-side directory holding the staged callback."""
+    return stage_path(conf) / "callback"
+
+
+def stage_callback(conf) -> None:
+    """Copy the clushible stdout callback into the stage for the runners."""
+    dest = callback_dir(conf)
+    dest.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(CALLBACK_DIR / "clushible.py", dest / "clushible.py")
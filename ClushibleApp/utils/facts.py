@@ -0,0 +1,130 @@
+#!/usr/bin/env python3.12
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from ClusterShell.NodeSet import NodeSet
+from ClusterShell.Task import task_self
+
+from . import msg
+from .stage import _remote_runners, stage_path
+
+# Ansible's jsonfile cache keeps one JSON file per host, named after it
+# (newer ansible-core prefixes a serialization version, e.g. s1_<host>),
+# and expires entries by file mtime; mtimes are kept through every copy.
+
+
+def _host_files(cache: Path, host: str) -> list:
+    """Cache files holding host's facts, in any naming ansible uses."""
+    files = [cache / host, *cache.glob(f"s[0-9]*_{host}")]
+    return [f for f in files if f.is_file()]
+
+
+def facts_path(conf) -> Path:
+    """Runner-side jsonfile fact cache for this run (inside the stage)."""
+    return stage_path(conf) / "facts"
+
+
+def fact_cache_env(conf) -> str:
+    """Shell exports pointing Ansible at the run's staged fact cache."""
+    if not conf.clushible.fact_cache:
+        return ""
+    return (
+        "export ANSIBLE_CACHE_PLUGIN=jsonfile"
+        f" ANSIBLE_CACHE_PLUGIN_CONNECTION={facts_path(conf)}"
+        f" ANSIBLE_CACHE_PLUGIN_TIMEOUT={conf.clushible.fact_cache_ttl}"
+        " ANSIBLE_GATHERING=smart; "
+    )
+
+
+def _fresh(path: Path, ttl: int, now: float) -> bool:
+    return ttl <= 0 or now - path.stat().st_mtime < ttl
+
+
+def seed_facts(conf, targets: list) -> None:
+    """Stage cached, unexpired facts for targets' hosts.
+
+    push_stage then copies them to every runner; any runner may pull any
+    chunk from the shared queue, so each gets the facts of the whole run.
+    """
+    cache = Path(conf.clushible.fact_cache)
+    dest = facts_path(conf)
+    dest.mkdir(parents=True, exist_ok=True)
+
+    now = time.time()
+    seeded = 0
+    for target in targets:
+        for host in target:
+            for src in _host_files(cache, host):
+                if _fresh(src, conf.clushible.fact_cache_ttl, now):
+                    shutil.copy2(src, dest / src.name)
+                    seeded += 1
+
+    if conf.core.verbose > 0:
+        msg.info(f"Fact cache: seeded {seeded} hosts from {cache}")
+
+
+def _merge(conf, src: Path, cache: Path) -> int:
+    """Copy host fact files newer than the cached ones into cache."""
+    merged = 0
+    for f in src.iterdir():
+        if not f.is_file():
+            continue
+        dst = cache / f.name
+        if dst.exists() and dst.stat().st_mtime >= f.stat().st_mtime:
+            continue
+        # Write then rename so concurrent runs never see a partial file
+        tmp = cache / f".{f.name}.{os.getpid()}"
+        shutil.copy2(f, tmp)
+        os.replace(tmp, dst)
+        merged += 1
+    return merged
+
+
+def expire_facts(conf) -> None:
+    """Drop facts older than fact_cache_ttl from the central cache."""
+    ttl = conf.clushible.fact_cache_ttl
+    cache = Path(conf.clushible.fact_cache)
+    if ttl <= 0 or not cache.is_dir():
+        return
+
+    now = time.time()
+    for f in cache.iterdir():
+        if f.is_file() and not _fresh(f, ttl, now):
+            f.unlink(missing_ok=True)
+
+
+def gather_facts(conf) -> None:
+    """Pull the runners' fact caches back and merge into the central one.
+
+    Remote runners are fetched in one fan-in rcopy; a local runner wrote
+    straight into the staged cache. Newest facts for a host win.
+    """
+    cache = Path(conf.clushible.fact_cache)
+    cache.mkdir(parents=True, exist_ok=True)
+    src = facts_path(conf)
+    merged = 0
+    if src.is_dir():
+        merged += _merge(conf, src, cache)
+
+    runners = _remote_runners(conf)
+    if not conf.clushible.stage_shared and len(runners) > 0:
+        with tempfile.TemporaryDirectory(dir=cache.parent) as tmp:
+            t = task_self()
+            t.rcopy(str(src), tmp, nodes=runners, preserve=True)
+            t.resume()
+            for rc, nodelist in t.iter_retcodes():
+                if rc != 0:
+                    msg.warn(
+                        f"Gathering facts failed on {NodeSet.fromlist(nodelist)} (RC {rc})."
+                    )
+            # rcopy lands each runner's copy in <tmp>/facts.<runner>
+            for d in Path(tmp).iterdir():
+                if d.is_dir():
+                    merged += _merge(conf, d, cache)
+
+    expire_facts(conf)
+    if conf.core.verbose > 0:
+        msg.info(f"Fact cache: merged {merged} host facts into {cache}")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3.12
+import contextlib
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+
+from . import msg
+
+# Weight of the newest sample in the per-host moving average
+EWMA_ALPHA = 0.5
+
+
+class RuntimeStore:
+    """Per-host runtime history kept in a small local SQLite database.
+
+    Each host keeps an exponentially weighted moving average of its elapsed
+    time, so the store stays one row per host regardless of run count.
+    Alongside it, each fscale keeps a moving average of how much slower
+    hosts ran at it than their history (fork contention on the runners),
+    and each runner the forks --adaptive-forks last settled on. Hosts'
+    last --reach-check result is kept for reuse within reach_ttl.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS host_runtime ("
+            " host TEXT PRIMARY KEY,"
+            " elapsed REAL NOT NULL,"
+            " runs INTEGER NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS fscale_slowdown ("
+            " fscale INTEGER PRIMARY KEY,"
+            " slowdown REAL NOT NULL,"
+            " runs INTEGER NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS runner_forks ("
+            " runner TEXT PRIMARY KEY,"
+            " forks INTEGER NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS host_reach ("
+            " host TEXT PRIMARY KEY,"
+            " alive INTEGER NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def record(self, runtimes: dict) -> None:
+        """Fold a {host: elapsed seconds} mapping into the history."""
+        now = time.time()
+        self.db.executemany(
+            "INSERT INTO host_runtime (host, elapsed, runs, updated)"
+            " VALUES (?, ?, 1, ?)"
+            " ON CONFLICT(host) DO UPDATE SET"
+            f" elapsed = {EWMA_ALPHA} * excluded.elapsed"
+            f" + {1 - EWMA_ALPHA} * elapsed,"
+            " runs = runs + 1, updated = excluded.updated",
+            [(h, float(e), now) for h, e in runtimes.items()],
+        )
+        self.db.commit()
+
+    def record_slowdown(self, fscale: int, slowdown: float) -> None:
+        """Fold one run's observed slowdown at fscale into the history."""
+        self.db.execute(
+            "INSERT INTO fscale_slowdown (fscale, slowdown, runs, updated)"
+            " VALUES (?, ?, 1, ?)"
+            " ON CONFLICT(fscale) DO UPDATE SET"
+            f" slowdown = {EWMA_ALPHA} * excluded.slowdown"
+            f" + {1 - EWMA_ALPHA} * slowdown,"
+            " runs = runs + 1, updated = excluded.updated",
+            (int(fscale), float(slowdown), time.time()),
+        )
+        self.db.commit()
+
+    def slowdowns(self) -> dict:
+        """Return {fscale: slowdown} for every measured fscale."""
+        cur = self.db.execute("SELECT fscale, slowdown FROM fscale_slowdown")
+        return dict(cur.fetchall())
+
+    def record_forks(self, forks: dict) -> None:
+        """Save {runner: forks} as the runners' recommended forks."""
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO runner_forks (runner, forks, updated)"
+            " VALUES (?, ?, ?)",
+            [(r, int(f), now) for r, f in forks.items()],
+        )
+        self.db.commit()
+
+    def runner_forks(self) -> dict:
+        """Return {runner: recommended forks}."""
+        cur = self.db.execute("SELECT runner, forks FROM runner_forks")
+        return dict(cur.fetchall())
+
+    def record_reach(self, reach: dict) -> None:
+        """Save {host: reachable} from a reachability probe."""
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO host_reach (host, alive, updated)"
+            " VALUES (?, ?, ?)",
+            [(h, int(up), now) for h, up in reach.items()],
+        )
+        self.db.commit()
+
+    def reach(self, hosts, ttl: float) -> dict:
+        """Return {host: reachable} for hosts probed in the last ttl s."""
+        hosts = list(hosts)
+        since = time.time() - ttl
+        reach = dict()
+        for i in range(0, len(hosts), 500):
+            batch = hosts[i : i + 500]
+            marks = ",".join("?" * len(batch))
+            cur = self.db.execute(
+                "SELECT host, alive FROM host_reach"
+                f" WHERE host IN ({marks}) AND updated >= ?",
+                [*batch, since],
+            )
+            reach.update((h, bool(up)) for h, up in cur.fetchall())
+        return reach
+
+    def costs(self, hosts) -> dict:
+        """Return {host: elapsed} for hosts with history."""
+        hosts = list(hosts)
+        costs = dict()
+        # Stay well under SQLite's bound parameter limit
+        for i in range(0, len(hosts), 500):
+            batch = hosts[i : i + 500]
+            marks = ",".join("?" * len(batch))
+            cur = self.db.execute(
+                "SELECT host, elapsed FROM host_runtime"
+                f" WHERE host IN ({marks})",
+                batch,
+            )
+            costs.update(cur.fetchall())
+        return costs
+
+
+@contextlib.contextmanager
+def _connect(conf, write: bool = False):
+    """Open conf's runtime history; yields None when there is none to use.
+
+    Without write, a missing history file isn't created. Errors are
+    warned about and suppressed: the history only ever improves a run.
+    """
+    path = conf.clushible.history
+    if not path or not (write or Path(path).exists()):
+        yield None
+        return
+
+    action = "record" if write else "read"
+    try:
+        store = RuntimeStore(path)
+    except (OSError, sqlite3.Error) as e:
+        msg.warn(f"Unable to {action} runtime history: {e}")
+        yield None
+        return
+
+    try:
+        yield store
+    except (OSError, sqlite3.Error) as e:
+        msg.warn(f"Unable to {action} runtime history: {e}")
+    finally:
+        store.close()
+
+
+def known_costs(conf, hosts) -> dict:
+    """{host: elapsed} for the hosts in hosts that have runtime history."""
+    with _connect(conf) as store:
+        if store is not None:
+            return store.costs(hosts)
+    return dict()
+
+
+def host_costs(conf, hosts) -> dict:
+    """Predicted cost of every host in hosts from the runtime history.
+
+    Hosts without history get the median of the known costs (or 1.0 when
+    nothing is known) so they are neither favoured nor starved.
+    """
+    hosts = list(hosts)
+    known = known_costs(conf, hosts)
+    default = statistics.median(known.values()) if known else 1.0
+    return {h: known.get(h, default) for h in hosts}
+
+
+def fscale_slowdowns(conf) -> dict:
+    """{fscale: per-host slowdown} measured by past runs, if any."""
+    with _connect(conf) as store:
+        if store is not None:
+            return store.slowdowns()
+    return dict()
+
+
+def recommended_forks(conf) -> dict:
+    """{runner: forks} that --adaptive-forks settled on in past runs."""
+    with _connect(conf) as store:
+        if store is not None:
+            return store.runner_forks()
+    return dict()
+
+
+def record_forks(conf, forks: dict) -> None:
+    """Save the runners' final adaptive forks, if history is enabled."""
+    if conf.core.dry_run or not forks:
+        return
+    with _connect(conf, write=True) as store:
+        if store is not None:
+            store.record_forks(forks)
+
+
+def cached_reach(conf, hosts) -> dict:
+    """{host: reachable} for hosts probed within conf's reach_ttl."""
+    if conf.clushible.reach_ttl <= 0:
+        return dict()
+    with _connect(conf) as store:
+        if store is not None:
+            return store.reach(hosts, conf.clushible.reach_ttl)
+    return dict()
+
+
+def record_reach(conf, reach: dict) -> None:
+    """Save reachability probe results, if history is enabled."""
+    if not reach:
+        return
+    with _connect(conf, write=True) as store:
+        if store is not None:
+            store.record_reach(reach)
+
+
+def record_runtimes(conf, runtimes: dict) -> None:
+    """Save per-host runtimes from this run, if history is enabled.
+
+    When forks came from fscale, the median ratio of this run's runtimes to
+    the hosts' history is also recorded as the slowdown at that fscale.
+    """
+    if conf.core.dry_run or not runtimes:
+        return
+    with _connect(conf, write=True) as store:
+        if store is None:
+            return
+        fscale = getattr(conf.clushible, "sample_fscale", None)
+        if fscale:
+            prior = store.costs(runtimes)
+            ratios = [runtimes[h] / c for h, c in prior.items() if c > 0]
+            if ratios:
+                store.record_slowdown(fscale, statistics.median(ratios))
+        store.record(runtimes)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3.12
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+from ClusterShell.NodeSet import NodeSet
+
+from . import msg
+from .errors import ClushibleError
+from .stage import stage_path
+from .transport import runner_path
+
+# Per-host and per-group variable directories Ansible reads next to the
+# inventory; slices link back to them rather than copying their contents.
+VARS_DIRS = ("group_vars", "host_vars")
+
+
+def _inventory_cmd(conf) -> str:
+    """ansible-inventory living next to the configured ansible-playbook."""
+    playbook_cmd = Path(conf.ansible.playbook_cmd)
+    if playbook_cmd.parent == Path("."):
+        return "ansible-inventory"
+    return str(playbook_cmd.with_name("ansible-inventory"))
+
+
+def _inventory_hash(inventory: Path) -> str:
+    """Content hash of the inventory sources, not counting vars dirs."""
+    h = hashlib.sha256()
+    if inventory.is_dir():
+        for root, dirs, files in os.walk(inventory):
+            dirs[:] = sorted(d for d in dirs if d not in VARS_DIRS)
+            for f in sorted(files):
+                p = Path(root) / f
+                h.update(str(p.relative_to(inventory)).encode("utf-8"))
+                h.update(p.read_bytes())
+    else:
+        h.update(inventory.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def _load_inventory(conf, cache: Path) -> dict:
+    """Inventory structure as exported by ansible-inventory (cached).
+
+    Vars plugins are disabled so group_vars/host_vars are not merged in;
+    only vars written in the inventory itself are exported, and vaulted
+    values stay encrypted.
+    """
+    export = cache / "inventory.json"
+    if export.exists():
+        return json.loads(export.read_text())
+
+    env = dict(os.environ, ANSIBLE_VARS_ENABLED="")
+    proc = subprocess.run(
+        [
+            _inventory_cmd(conf),
+            "-i",
+            conf.ansible.inventory,
+            "--list",
+            "--export",
+        ],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        env=env,
+        cwd=conf.ansible.project_dir,
+    )
+    if proc.returncode != 0:
+        raise ClushibleError(
+            f"ansible-inventory failed on '{conf.ansible.inventory}': {proc.stderr.decode('utf-8').strip()}"
+        )
+
+    cache.mkdir(parents=True, exist_ok=True)
+    export.write_bytes(proc.stdout)
+    return json.loads(proc.stdout)
+
+
+def _yaml(obj) -> str:
+    """Serialize to YAML flow style (JSON plus !vault tagged scalars)."""
+    if isinstance(obj, dict):
+        if set(obj) == {"__ansible_vault"}:
+            return "!vault " + json.dumps(obj["__ansible_vault"])
+        items = (f"{json.dumps(str(k))}: {_yaml(v)}" for k, v in obj.items())
+        return "{" + ", ".join(items) + "}"
+    if isinstance(obj, list):
+        return "[" + ", ".join(_yaml(v) for v in obj) + "]"
+    return json.dumps(obj)
+
+
+def _slice(inventory: dict, target: NodeSet) -> dict:
+    """Minimal YAML inventory with target's hosts and their groups."""
+    hostvars = inventory.get("_meta", {}).get("hostvars", {})
+    parents = dict()
+    for group, data in inventory.items():
+        for child in data.get("children", []) if group != "_meta" else []:
+            parents.setdefault(child, set()).add(group)
+
+    hosts = set(target)
+    groups = dict()
+    for group, data in inventory.items():
+        if group in {"_meta", "all"}:
+            continue
+        members = [h for h in data.get("hosts", []) if h in hosts]
+        if not members:
+            continue
+        groups.setdefault(group, {})["hosts"] = {
+            h: hostvars.get(h, {}) for h in members
+        }
+
+    # Pull in every ancestor of a used group, keeping parent/child links
+    pending = list(groups)
+    while pending:
+        group = pending.pop()
+        for parent in parents.get(group, ()):
+            if parent == "all":
+                continue
+            if parent not in groups:
+                groups[parent] = {}
+                pending.append(parent)
+            groups[parent].setdefault("children", {})[group] = {}
+
+    for group, data in groups.items():
+        if inventory.get(group, {}).get("vars"):
+            data["vars"] = inventory[group]["vars"]
+
+    sliced = {"all": {"children": groups}}
+    if inventory.get("all", {}).get("vars"):
+        sliced["all"]["vars"] = inventory["all"]["vars"]
+    return sliced
+
+
+def slice_file(conf, target: NodeSet) -> Path:
+    """Path of the staged inventory slice for target."""
+    digest = hashlib.sha1(str(target).encode("utf-8")).hexdigest()[:16]
+    return stage_path(conf) / "inventory" / f"{digest}.yml"
+
+
+def write_inventory_slices(conf, targets: list) -> None:
+    """Write a minimal inventory for each target set into the stage dir.
+
+    Slices are cached by inventory content hash so reruns on an unchanged
+    inventory only copy them. group_vars/host_vars next to the inventory
+    are linked from the staged slices so Ansible still finds them; the
+    links point where the runners see them (see runner_path).
+    """
+    inventory = Path(conf.ansible.inventory)
+    cache = Path(conf.clushible.inventory_cache) / _inventory_hash(inventory)
+    exported = None
+
+    dest = stage_path(conf) / "inventory"
+    dest.mkdir(parents=True, exist_ok=True)
+    inv_dir = inventory if inventory.is_dir() else inventory.parent
+    for d in VARS_DIRS:
+        link = dest / d
+        if (inv_dir / d).is_dir() and not link.is_symlink():
+            link.symlink_to(runner_path(conf, (inv_dir / d).resolve()))
+
+    for target in targets:
+        cached = cache / slice_file(conf, target).name
+        if not cached.exists():
+            if exported is None:
+                exported = _load_inventory(conf, cache)
+            cached.write_text(_yaml(_slice(exported, target)) + "\n")
+        shutil.copyfile(cached, slice_file(conf, target))
+
+    if conf.core.verbose > 0:
+        msg.info(f"Inventory slices for {len(targets)} chunks in {dest}")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3.12
+import sqlite3
+import zlib
+from pathlib import Path
+
+from ClusterShell.Event import EventHandler
+from ClusterShell.NodeSet import NodeSet
+from ClusterShell.Task import task_self
+
+from . import msg
+from .events import parse_line
+
+# Runner-side playbook logs (see generate_playbook_cmd)
+RUNNER_LOG_DIR = "/var/tmp/clushible"
+
+
+def host_of(line: str) -> str:
+    """Host an output line belongs to, else None."""
+    event = parse_line(line)
+    if event is None or event.host is None:
+        return None
+    return event.host
+
+
+class LogWriter:
+    """Splits one run's log lines by host, compressing as they arrive.
+
+    Each host's lines go through their own zlib stream; on close every
+    host's compressed block is appended to the run's data file and its
+    (offset, length) recorded in the index.
+    """
+
+    def __init__(self, store, run_id: str):
+        self.store = store
+        self.run_id = run_id
+        self._streams = dict()  # host -> (compressobj, [chunks], lines)
+
+    def add_line(self, host: str, line: bytes) -> None:
+        stream = self._streams.get(host)
+        if stream is None:
+            stream = self._streams[host] = (zlib.compressobj(6), [], [0])
+        z, out, lines = stream
+        data = z.compress(line + b"\n")
+        if data:
+            out.append(data)
+        lines[0] += 1
+
+    def close(self) -> int:
+        """Write out all hosts' blocks; returns the number of hosts."""
+        if not self._streams:
+            return 0
+
+        rows = []
+        path = self.store.data_file(self.run_id)
+        with path.open("ab") as f:
+            offset = f.tell()
+            for host, (z, out, lines) in self._streams.items():
+                out.append(z.flush())
+                block = b"".join(out)
+                f.write(block)
+                rows.append((self.run_id, host, offset, len(block), lines[0]))
+                offset += len(block)
+
+        self.store.db.executemany(
+            "INSERT OR REPLACE INTO log_index"
+            " (run_id, host, offset, length, lines)"
+            " VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.store.db.commit()
+        self._streams.clear()
+        return len(rows)
+
+
+class LogStore:
+    """Central per-host log store: zlib blocks plus a SQLite index.
+
+    <path>/<run_id>.logz holds every host's compressed block for a run and
+    <path>/index.db maps (run_id, host) to the block's byte range, so one
+    host's log is a single indexed seek and decompress.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path / "index.db"))
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS log_index ("
+            " run_id TEXT NOT NULL,"
+            " host TEXT NOT NULL,"
+            " offset INTEGER NOT NULL,"
+            " length INTEGER NOT NULL,"
+            " lines INTEGER NOT NULL,"
+            " PRIMARY KEY (host, run_id))"
+        )
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def data_file(self, run_id: str) -> Path:
+        return self.path / f"{run_id}.logz"
+
+    def writer(self, run_id: str) -> LogWriter:
+        return LogWriter(self, run_id)
+
+    def runs(self, host: str) -> list:
+        """(run_id, lines) for every run host has logs in, newest first."""
+        cur = self.db.execute(
+            "SELECT run_id, lines FROM log_index WHERE host = ?"
+            " ORDER BY run_id DESC",
+            (host,),
+        )
+        return cur.fetchall()
+
+    def read(self, host: str, run_id: str = None) -> str:
+        """host's log from run_id (latest run when None), or None."""
+        if run_id is None:
+            runs = self.runs(host)
+            if not runs:
+                return None
+            run_id = runs[0][0]
+
+        row = self.db.execute(
+            "SELECT offset, length FROM log_index"
+            " WHERE host = ? AND run_id = ?",
+            (host, run_id),
+        ).fetchone()
+        if row is None:
+            return None
+
+        with self.data_file(run_id).open("rb") as f:
+            f.seek(row[0])
+            block = f.read(row[1])
+        return zlib.decompress(block).decode("utf-8", errors="replace")
+
+
+class _GatherHandler(EventHandler):
+    """Feeds runner log lines to a LogWriter as they stream in."""
+
+    def __init__(self, writer: LogWriter):
+        EventHandler.__init__(self)
+        self.writer = writer
+
+    def ev_read(self, worker, node, sname, msg):
+        # Lines with no host go under the runner that produced them
+        host = host_of(msg.decode("utf-8", errors="replace"))
+        self.writer.add_line(host or f"@{node}", msg)
+
+
+def gather_logs(conf) -> None:
+    """Pull this run's playbook logs from all runners into the log store.
+
+    One fan-in streams every runner's logs; lines are split by host and
+    compressed on arrival, so nothing is held uncompressed.
+    """
+    store = LogStore(conf.clushible.log_store)
+    writer = store.writer(conf.clushible.run_id)
+
+    t = task_self()
+    t.set_default("stdout_msgtree", False)
+    if len(NodeSet(conf.clushible.runners)) > t.info("fanout"):
+        t.set_info("fanout", len(NodeSet(conf.clushible.runners)))
+    t.shell(
+        f"cat {RUNNER_LOG_DIR}/{conf.clushible.run_id}.*.log 2>/dev/null; true",
+        nodes=conf.clushible.runners,
+        handler=_GatherHandler(writer),
+    )
+    t.resume()
+    t.set_default("stdout_msgtree", True)
+
+    for rc, nodelist in t.iter_retcodes():
+        if rc != 0:
+            msg.warn(
+                f"Gathering logs failed on {NodeSet.fromlist(nodelist)} (RC {rc})."
+            )
+
+    hosts = writer.close()
+    store.close()
+    if conf.core.verbose > 0:
+        msg.info(
+            f"Gathered logs for {hosts} hosts into {store.data_file(conf.clushible.run_id)}"
+        )
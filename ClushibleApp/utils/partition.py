@@ -0,0 +1,54 @@
+#!/usr/bin/env python3.12
+import heapq
+
+from ClusterShell.NodeSet import NodeSet
+
+from .history import host_costs
+
+
+def pack(targets: NodeSet, forks: int) -> list:
+    """Slice targets in order into sets of forks hosts."""
+    tgt = list(targets)
+    return [
+        NodeSet.fromlist(tgt[i : i + forks])
+        for i in range(0, len(targets), forks)
+    ]
+
+
+def scatter(targets: NodeSet, nsets: int) -> list:
+    """Split targets into nsets sets of (nearly) equal host count."""
+    return [x for x in targets.split(nsets)]
+
+
+def balanced(targets: NodeSet, nsets: int, costs: dict) -> list:
+    """Split targets into nsets sets of roughly equal predicted runtime.
+
+    Longest-processing-time first: hosts are taken from most to least
+    expensive and each goes to the set with the least total cost so far.
+    Sets are returned most expensive first.
+    """
+    bins = [(0.0, i) for i in range(nsets)]
+    members = [[] for _ in range(nsets)]
+    for host in sorted(targets, key=lambda h: costs[h], reverse=True):
+        load, i = heapq.heappop(bins)
+        members[i].append(host)
+        heapq.heappush(bins, (load + costs[host], i))
+
+    loads = dict((i, load) for load, i in bins)
+    order = sorted(range(nsets), key=lambda i: loads[i], reverse=True)
+    return [NodeSet.fromlist(members[i]) for i in order if members[i]]
+
+
+# --distribution choices (keep options.toml in step)
+POLICIES = ("pack", "scatter", "balanced")
+
+
+def partition(conf, targets: NodeSet) -> list:
+    """Partition targets per the configured distribution."""
+    if conf.clushible.distribution == "pack":
+        return pack(targets, conf.ansible.forks)
+    if conf.clushible.distribution == "balanced":
+        costs = host_costs(conf, targets)
+        return balanced(targets, conf.clushible.nsets, costs)
+    # if conf.clushible.distribution == 'scatter'
+    return scatter(targets, conf.clushible.nsets)
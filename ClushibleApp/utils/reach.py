@@ -0,0 +1,117 @@
+#!/usr/bin/env python3.12
+import itertools
+import math
+import shlex
+
+from ClusterShell.NodeSet import NodeSet
+from ClusterShell.Task import task_self
+
+from . import msg
+from .history import cached_reach, record_reach
+
+# Hosts per probe command, keeping the remote command line well under the
+# kernel's single-argument limit; a runner may get several
+REACH_BATCH = 2000
+
+# Concurrent connects per probe command
+REACH_PARALLEL = 128
+
+# Seconds a probe command gets on top of its connects (ssh, python start)
+REACH_SLACK = 30
+
+# Runs on the runners with python3 (Ansible needs it there anyway):
+# argv is port, timeout, hosts...; prints "host 1" or "host 0" per host
+_PROBE = """
+import socket, sys
+from concurrent.futures import ThreadPoolExecutor
+port, timeout, hosts = int(sys.argv[1]), float(sys.argv[2]), sys.argv[3:]
+def up(h):
+    try:
+        socket.create_connection((h, port), timeout).close()
+        return 1
+    except OSError:
+        return 0
+with ThreadPoolExecutor(PARALLEL) as p:
+    for h, u in zip(hosts, p.map(up, hosts)):
+        print(h, u)
+""".replace("PARALLEL", str(REACH_PARALLEL))
+
+
+def probe_cmd(conf, hosts: list) -> str:
+    return " ".join(
+        shlex.quote(a)
+        for a in [
+            "python3",
+            "-c",
+            _PROBE,
+            str(conf.clushible.reach_port),
+            str(conf.clushible.reach_timeout),
+            *hosts,
+        ]
+    )
+
+
+def probe_reach(conf, hosts: NodeSet, runners: NodeSet) -> dict:
+    """{host: reachable} from TCP connects made by the runners.
+
+    hosts are spread over the runners, which all probe at once. Hosts of a
+    runner whose probe failed or timed out are left out.
+    """
+    hosts = list(hosts)
+    nbatches = max(len(runners), math.ceil(len(hosts) / REACH_BATCH))
+    size = math.ceil(len(hosts) / nbatches)
+    rounds = math.ceil(size / REACH_PARALLEL)
+    timeout = conf.clushible.reach_timeout * rounds + REACH_SLACK
+
+    task = task_self()
+    workers = []
+    starts = range(0, len(hosts), size)
+    for i, runner in zip(starts, itertools.cycle(runners)):
+        cmd = probe_cmd(conf, hosts[i : i + size])
+        worker = task.shell(cmd, nodes=runner, timeout=timeout)
+        workers.append((runner, worker))
+    task.run()
+
+    reach = dict()
+    for runner, w in workers:
+        if w.num_timeout():
+            msg.warn(f"Reachability probe timed out on runner {runner}.")
+            continue
+        try:
+            rc = w.node_retcode(runner)
+        except KeyError:
+            rc = None
+        if rc != 0:
+            msg.warn(f"Reachability probe failed on runner {runner}.")
+            continue
+        out = w.node_buffer(runner) or b""
+        for line in out.decode("utf-8", errors="replace").splitlines():
+            fields = line.split()
+            if len(fields) == 2 and fields[1] in ("0", "1"):
+                reach[fields[0]] = fields[1] == "1"
+    return reach
+
+
+def filter_reachable(conf, targets: NodeSet, runners: str) -> tuple:
+    """Split targets into (reachable, unreachable) before partitioning.
+
+    Hosts whose port conf.clushible.reach_port doesn't accept a connection
+    within reach_timeout would otherwise each hold a fork until ssh gives
+    up. Results are reused from the history for reach_ttl seconds; hosts
+    nobody could probe count as reachable.
+    """
+    reach = cached_reach(conf, targets)
+    unknown = targets.difference(NodeSet.fromlist(list(reach)))
+    if len(unknown):
+        probed = probe_reach(conf, unknown, NodeSet(runners))
+        record_reach(conf, probed)
+        reach.update(probed)
+
+    dead = NodeSet.fromlist([h for h, up in reach.items() if not up])
+    alive = targets.difference(dead)
+    if conf.core.verbose > 0:
+        msg.info(
+            f"Reachability: {len(alive)} reachable, {len(dead)} not"
+            f" ({len(targets) - len(unknown)} cached)"
+        )
+    return alive, dead
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3.12
+import threading
+import time
+
+from ClusterShell.NodeSet import NodeSet
+
+from .events import HostEvent, parse_line
+
+# Final host statuses, most to least severe
+STATUSES = ("unreachable", "failed", "changed", "ok")
+
+
+class Report:
+    """Per-host final status from PLAY RECAP records.
+
+    A host's status is the most severe non-zero recap counter. A later
+    recap for the same host (e.g. from a retry) replaces the earlier one,
+    except that a host changed by an earlier playbook stays changed.
+    Runner failovers, hosts left without a runner and hosts the
+    reachability check kept from dispatch are recorded too. Dispatched
+    hosts that never report a recap count as failed.
+    """
+
+    def __init__(self):
+        self.status = dict()  # host -> status
+        self.updated = dict()  # host -> monotonic time of its last recap
+        self.failovers = []  # (runner, reason, re-queued hosts)
+        self.unrun = NodeSet()
+        self.aborted = NodeSet()  # left out of an aborted rollout
+        self.abort_reason = None
+        self.dead = NodeSet()  # unreachable before dispatch (--reach-check)
+        self.expected = NodeSet()  # dispatched hosts that owe a recap
+        self._lock = threading.Lock()
+
+    def add_event(self, event: HostEvent) -> None:
+        if event.status != "recap":
+            return
+        status = event.final_status()
+        with self._lock:
+            if status == "ok" and self.status.get(event.host) == "changed":
+                status = "changed"
+            self.status[event.host] = status
+            self.updated[event.host] = time.monotonic()
+
+    def add_line(self, line: str) -> None:
+        event = parse_line(line)
+        if event is not None:
+            self.add_event(event)
+
+    def feed(self, buf: bytes) -> None:
+        for line in buf.decode("utf-8", errors="replace").split("\n"):
+            self.add_line(line)
+
+    def reported_since(self, since: float) -> NodeSet:
+        """Hosts with a recap at or after monotonic time since."""
+        with self._lock:
+            return NodeSet.fromlist(
+                [h for h, t in self.updated.items() if t >= since]
+            )
+
+    def dispatched(self, hosts: NodeSet) -> None:
+        with self._lock:
+            self.expected.update(hosts)
+
+    def no_recap(self) -> NodeSet:
+        """Dispatched hosts without a recap (other than those not run)."""
+        with self._lock:
+            missing = self.expected.difference(
+                NodeSet.fromlist(list(self.status))
+            )
+            missing.difference_update(self.unrun)
+            missing.difference_update(self.aborted)
+        return missing
+
+    def runner_failed(self, runner: str, reason: str, requeued: NodeSet):
+        with self._lock:
+            self.failovers.append((runner, reason, requeued))
+
+    def orphaned(self, hosts: NodeSet) -> None:
+        with self._lock:
+            self.unrun.update(hosts)
+
+    def abort(self, hosts: NodeSet, reason: str) -> None:
+        with self._lock:
+            self.aborted.update(hosts)
+            self.abort_reason = reason
+
+    def unreachable(self, hosts: NodeSet) -> None:
+        with self._lock:
+            self.dead.update(hosts)
+
+    def hosts(self, *statuses) -> NodeSet:
+        """Hosts whose final status is any of statuses."""
+        with self._lock:
+            return NodeSet.fromlist(
+                [h for h, s in self.status.items() if s in statuses]
+            )
+
+    def failed(self) -> NodeSet:
+        """Hosts that failed, were unreachable or never reported."""
+        failed = self.hosts("failed", "unreachable")
+        failed.update(self.no_recap())
+        return failed
+
+    def summary(self, targets: NodeSet) -> str:
+        """Per-status host counts and nodesets, plus hosts never reported."""
+        lines = []
+        for s in reversed(STATUSES):
+            hosts = self.hosts(s)
+            if len(hosts):
+                lines.append(f"{s}: {len(hosts)}: {hosts}")
+
+        if len(self.dead):
+            lines.append(f"not dispatched: {len(self.dead)}: {self.dead}")
+
+        missing = targets.difference(NodeSet.fromlist(list(self.status)))
+        missing.difference_update(self.dead)
+        if len(missing):
+            lines.append(f"no recap: {len(missing)}: {missing}")
+        return "\n".join(lines)
+
+    def failover_summary(self) -> str:
+        """Dead runners, what was moved off them and what never ran."""
+        lines = []
+        for runner, reason, requeued in self.failovers:
+            lines.append(
+                f"runner {runner} {reason}: {requeued} ({len(requeued)}) re-queued"
+            )
+        if len(self.unrun):
+            lines.append(f"not run (no runners left): {self.unrun}")
+        if len(self.dead):
+            lines.append(f"not run (unreachable before dispatch): {self.dead}")
+        if len(self.aborted):
+            lines.append(
+                f"not run (rollout aborted, {self.abort_reason}): {self.aborted}"
+            )
+        return "\n".join(lines)
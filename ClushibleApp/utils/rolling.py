@@ -0,0 +1,81 @@
+#!/usr/bin/env python3.12
+import math
+
+from .errors import ClushibleError
+
+# First batch is this fraction of the in-flight cap (a canary)
+FIRST_BATCH = 0.1
+
+# A batch slower than this fraction of the best batch's throughput means
+# the rollout is saturating something; back off
+DEGRADED = 0.5
+
+
+def parse_cap(value, total: int) -> int:
+    """Hosts allowed in flight from "N" or "P%" of total; 0 is no cap."""
+    value = str(value or "").strip()
+    if not value:
+        return 0
+    try:
+        if value.endswith("%"):
+            return max(math.floor(total * float(value[:-1]) / 100), 1)
+        return max(int(value), 0)
+    except ValueError:
+        raise ClushibleError(
+            f"Invalid --max-inflight '{value}', expected N or P%"
+        )
+
+
+class Rollout:
+    """Host budget, batch size and failure stop for rolling dispatch.
+
+    Runners may only start hosts while fewer than cap are in flight, and at
+    most batch at a time. The batch doubles after a batch with no failures
+    that kept up its throughput, and halves after one with failures or
+    that slowed down. Once more than max_fail_pct of the finished hosts
+    have failed, the rollout is aborted.
+    """
+
+    def __init__(self, cap: int, max_fail_pct: float):
+        self.cap = cap
+        self.max_fail_pct = max_fail_pct
+        self.batch = max(math.ceil(cap * FIRST_BATCH), 1)
+        self.inflight = 0
+        self.finished_hosts = 0
+        self.failed_hosts = 0
+        self.best = 0.0  # best batch throughput (hosts/s)
+        self.aborted = None  # reason, once aborted
+
+    def allowance(self) -> int:
+        """Hosts a runner may start right now."""
+        if self.aborted:
+            return 0
+        return max(min(self.batch, self.cap - self.inflight), 0)
+
+    def started(self, hosts: int) -> None:
+        self.inflight += hosts
+
+    def released(self, hosts: int) -> None:
+        self.inflight -= hosts
+
+    def finished(self, hosts: int, failed: int, elapsed: float) -> None:
+        """Fold in a batch whose hosts are done; adapt or abort."""
+        if hosts == 0:
+            return
+        self.finished_hosts += hosts
+        self.failed_hosts += failed
+
+        pct = 100 * self.failed_hosts / self.finished_hosts
+        if pct > self.max_fail_pct:
+            self.aborted = (
+                f"{self.failed_hosts}/{self.finished_hosts} hosts failed"
+                f" ({pct:.0f}% > --max-fail-pct {self.max_fail_pct:g})"
+            )
+            return
+
+        rate = hosts / max(elapsed, 1e-3)
+        if failed or rate < DEGRADED * self.best:
+            self.batch = max(self.batch // 2, 1)
+        else:
+            self.batch = min(self.batch * 2, self.cap)
+        self.best = max(self.best, rate)
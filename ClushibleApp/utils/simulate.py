@@ -0,0 +1,169 @@
+#!/usr/bin/env python3.12
+import bisect
+import collections
+import heapq
+from dataclasses import dataclass, field
+
+# Ansible startup (interpreter, inventory, play compile) paid per chunk
+CHUNK_OVERHEAD_S = 2.0
+
+# fscale values tried when forks are auto
+FSCALES = (1, 2, 3, 4, 6, 8)
+
+# Candidates listed in the report, fastest first
+TOP = 12
+
+
+@dataclass
+class Prediction:
+    """Predicted outcome of dispatching one candidate plan."""
+
+    distribution: str
+    fscale: int
+    nsets: int  # 0 = auto
+    chunks: int
+    finish: dict  # runner -> predicted finish time (seconds)
+    busy: dict = field(default_factory=dict)  # runner -> seconds running
+    measured: bool = True  # fork slowdown at fscale came from history
+
+    @property
+    def makespan(self) -> float:
+        return max(self.finish.values(), default=0.0)
+
+    @property
+    def utilization(self) -> float:
+        """Runner time spent busy over runners x makespan."""
+        if not self.finish or self.makespan == 0:
+            return 0.0
+        return sum(self.busy.values()) / (len(self.finish) * self.makespan)
+
+    @property
+    def bottleneck(self) -> str:
+        return max(self.finish, key=self.finish.get, default=None)
+
+
+def slowdown_at(slowdowns: dict, fscale: int) -> float:
+    """Per-host slowdown at fscale from the measured fscales.
+
+    Between measured fscales the slowdown is interpolated. Past the
+    largest one, forks are assumed to be saturated already: more forks only
+    stretch every host (no gain), so unmeasured large fscales never look
+    better than the last measured one. Below the smallest, its value holds.
+    """
+    if fscale in slowdowns:
+        return slowdowns[fscale]
+
+    known = sorted(slowdowns)
+    i = bisect.bisect_left(known, fscale)
+    if i == 0:
+        return slowdowns[known[0]]
+    if i == len(known):
+        top = known[-1]
+        return slowdowns[top] * fscale / top
+    lo, hi = known[i - 1], known[i]
+    w = (fscale - lo) / (hi - lo)
+    return slowdowns[lo] * (1 - w) + slowdowns[hi] * w
+
+
+def chunk_time(hosts, forks: int, costs: dict, slowdown: float) -> float:
+    """Predicted wall time of one ansible-playbook over hosts.
+
+    The chunk can't finish before its slowest host, nor before its total
+    host time spread over forks. Contention slows Ansible's own startup as
+    much as the hosts.
+    """
+    c = [costs[h] for h in hosts]
+    if not c:
+        return 0.0
+    work = max(max(c), sum(c) / max(forks, 1))
+    return (CHUNK_OVERHEAD_S + work) * slowdown
+
+
+def simulate_queue(
+    chunks: list,
+    runner_forks: dict,
+    costs: dict,
+    slowdown: float = 1.0,
+):
+    """Replay the shared work queue; returns (finish, busy) per runner.
+
+    Mirrors RunnerHandler: every runner starts at once, pulls whole chunks
+    up to its forks in hosts whenever it is free and runs them as one
+    ansible-playbook with its own forks.
+    """
+    work = collections.deque(chunks)
+    finish = {r: 0.0 for r in runner_forks}
+    busy = {r: 0.0 for r in runner_forks}
+    free = [(0.0, r) for r in sorted(runner_forks)]
+    heapq.heapify(free)
+
+    while work and free:
+        now, r = heapq.heappop(free)
+        forks = runner_forks[r]
+        hosts = list(work.popleft())
+        while work and len(hosts) + len(work[0]) <= forks:
+            hosts.extend(work.popleft())
+        t = chunk_time(hosts, forks, costs, slowdown)
+        busy[r] += t
+        finish[r] = now + t
+        heapq.heappush(free, (now + t, r))
+
+    return finish, busy
+
+
+def _row(p: Prediction) -> str:
+    mark = "" if p.measured else "*"
+    nsets = p.nsets if p.nsets else "auto"
+    return (
+        f"  {p.distribution:<10} {str(p.fscale) + mark:>6} {nsets:>6}"
+        f" {p.chunks:>6} {p.makespan:>10.1f} {p.utilization:>6.0%}"
+        f"  {p.bottleneck}"
+    )
+
+
+def simulation_report(
+    predictions: list, current: list, sources: str, forks_fixed: bool
+) -> str:
+    """Text report: current settings per policy, the sweep, a pick.
+
+    current holds the prediction for the configured fscale/nsets under
+    each distribution policy.
+    """
+    lines = [sources, ""]
+    for p in current:
+        lines.append(
+            f"{p.distribution}: makespan {p.makespan:.1f}s,"
+            f" utilization {p.utilization:.0%}, bottleneck {p.bottleneck}"
+        )
+        for r in sorted(p.finish):
+            lines.append(
+                f"  {r}: finishes {p.finish[r]:.1f}s (busy {p.busy[r]:.1f}s)"
+            )
+    lines.append("")
+
+    lines.append(
+        f"  {'policy':<10} {'fscale':>6} {'nsets':>6} {'chunks':>6}"
+        f" {'makespan':>10} {'util':>6}  bottleneck"
+    )
+    ranked = sorted(predictions, key=lambda p: (p.makespan, p.fscale))
+    for p in ranked[:TOP]:
+        lines.append(_row(p))
+    if len(ranked) > TOP:
+        lines.append(f"  ... {len(ranked) - TOP} slower candidates")
+    if any(not p.measured for p in ranked[:TOP]):
+        lines.append(
+            "  * fork slowdown not measured at this fscale (extrapolated)"
+        )
+    lines.append("")
+
+    best = ranked[0]
+    now = min(current, key=lambda p: p.makespan)
+    opts = f"--distribution {best.distribution} --nsets {best.nsets}"
+    if not forks_fixed:
+        opts += f" --fscale {best.fscale}"
+    gain = 1 - best.makespan / now.makespan if now.makespan else 0.0
+    lines.append(
+        f"Recommended: {opts} (makespan {best.makespan:.1f}s,"
+        f" {gain:.0%} below the best current policy)"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3.12
+import shutil
+import socket
+from pathlib import Path
+
+from ClusterShell.NodeSet import NodeSet
+from ClusterShell.Task import task_self
+
+from . import msg
+
+
+def stage_path(conf) -> Path:
+    """Directory holding this run's staged artifacts (same path on runners)."""
+    return Path(conf.clushible.stage_dir) / conf.clushible.run_id
+
+
+def _remote_runners(conf) -> NodeSet:
+    """Runners other than the controller itself."""
+    runners = NodeSet(conf.clushible.runners)
+    local = {"localhost", socket.gethostname(), socket.getfqdn()}
+    local.add(socket.gethostname().split(".")[0])
+    runners.difference_update(",".join(local))
+    return runners
+
+
+def push_stage(conf) -> None:
+    """Copy this run's stage directory to every runner in one fan-out.
+
+    Nothing is copied when stage_dir is on storage shared with the runners.
+    """
+    src = stage_path(conf)
+    if conf.clushible.stage_shared or not src.exists():
+        return
+
+    runners = _remote_runners(conf)
+    if len(runners) == 0:
+        return
+
+    t = task_self()
+    t.run(f"{conf.clushible.mkdir} -p {src.parent}", nodes=runners)
+    t.copy(str(src), str(src.parent), nodes=runners, preserve=True)
+    t.resume()
+
+    for rc, nodelist in t.iter_retcodes():
+        if rc != 0:
+            msg.warn(
+                f"Staging {src} failed on {NodeSet.fromlist(nodelist)} (RC {rc})."
+            )
+        elif conf.core.verbose > 0:
+            msg.info(f"Staged {src} on {NodeSet.fromlist(nodelist)}")
+
+
+def cleanup_stage(conf) -> None:
+    """Remove this run's stage directory locally and on runners."""
+    src = stage_path(conf)
+    if not src.exists():
+        return
+
+    runners = _remote_runners(conf)
+    if not conf.clushible.stage_shared and len(runners) > 0:
+        t = task_self()
+        t.run(f"/bin/rm -rf {src}", nodes=runners)
+
+    shutil.rmtree(src, ignore_errors=True)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3.12
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from . import msg
+
+
+class Telemetry:
+    """Wall time per phase plus per-chunk dispatch records for one run.
+
+    Lives on conf.clushible.telemetry. Copies of conf (plan, Dispatcher)
+    share the same recorder, so phases timed anywhere end up in one
+    report. Times are monotonic seconds relative to creation.
+    """
+
+    def __init__(self):
+        self.t0 = time.monotonic()
+        self.started = time.time()
+        self.phases = dict()  # phase -> seconds (summed over repeats)
+        self.chunks = []  # one dict per finished or failed chunk
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def chunk(self, chunk_id, runner, hosts, start, end, nbytes, rc=None):
+        with self._lock:
+            self.chunks.append(
+                {
+                    "chunk": chunk_id,
+                    "runner": runner,
+                    "hosts": hosts,
+                    "start": round(start - self.t0, 6),
+                    "end": round(end - self.t0, 6),
+                    "bytes": nbytes,
+                    "rc": rc,
+                }
+            )
+
+    def runners(self) -> dict:
+        """Per-runner totals derived from the chunk records."""
+        runners = dict()
+        for c in self.chunks:
+            r = runners.setdefault(
+                c["runner"],
+                {
+                    "chunks": 0,
+                    "hosts": 0,
+                    "bytes": 0,
+                    "busy": 0.0,
+                    "first_start": c["start"],
+                    "last_end": c["end"],
+                },
+            )
+            r["chunks"] += 1
+            r["hosts"] += c["hosts"]
+            r["bytes"] += c["bytes"]
+            r["busy"] += c["end"] - c["start"]
+            r["first_start"] = min(r["first_start"], c["start"])
+            r["last_end"] = max(r["last_end"], c["end"])
+        return runners
+
+    def report(self, conf) -> dict:
+        with self._lock:
+            runners = self.runners()
+            return {
+                "run_id": getattr(conf.clushible, "run_id", None),
+                "started": self.started,
+                "elapsed": time.monotonic() - self.t0,
+                "targets": conf.clushible.targets,
+                "distribution": conf.clushible.distribution,
+                "forks": conf.ansible.forks,
+                "phases": dict(self.phases),
+                "runners": runners,
+                "chunks": list(self.chunks),
+            }
+
+
+@contextlib.contextmanager
+def timer(conf, phase: str):
+    """Add the block's wall time to phase, if conf carries telemetry."""
+    telemetry = getattr(conf.clushible, "telemetry", None)
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        if telemetry is not None:
+            telemetry.add(phase, time.monotonic() - start)
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    # node_exporter may read the textfile at any moment
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def prometheus_text(report: dict) -> str:
+    """node_exporter textfile collector metrics for a run report."""
+    lines = []
+
+    def metric(name, help, samples):
+        lines.append(f"# HELP clushible_{name} {help}")
+        lines.append(f"# TYPE clushible_{name} gauge")
+        for labels, value in samples:
+            lbl = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            lbl = f"{{{lbl}}}" if lbl else ""
+            lines.append(f"clushible_{name}{lbl} {value}")
+
+    runners = report["runners"].items()
+    metric(
+        "run_timestamp_seconds",
+        "Start time of the last run.",
+        [({}, report["started"])],
+    )
+    metric(
+        "run_elapsed_seconds",
+        "Wall time of the last run.",
+        [({}, report["elapsed"])],
+    )
+    metric(
+        "phase_seconds",
+        "Wall time of each phase of the last run.",
+        [({"phase": p}, s) for p, s in report["phases"].items()],
+    )
+    metric(
+        "runner_busy_seconds",
+        "Time each runner spent running chunks.",
+        [({"runner": r}, v["busy"]) for r, v in runners],
+    )
+    metric(
+        "runner_last_end_seconds",
+        "When each runner finished its last chunk, from run start.",
+        [({"runner": r}, v["last_end"]) for r, v in runners],
+    )
+    metric(
+        "runner_chunks",
+        "Chunks run by each runner.",
+        [({"runner": r}, v["chunks"]) for r, v in runners],
+    )
+    metric(
+        "runner_hosts",
+        "Target hosts dispatched to each runner.",
+        [({"runner": r}, v["hosts"]) for r, v in runners],
+    )
+    metric(
+        "runner_output_bytes",
+        "Bytes of output received from each runner.",
+        [({"runner": r}, v["bytes"]) for r, v in runners],
+    )
+    return "\n".join(lines) + "\n"
+
+
+def write_telemetry(conf) -> dict:
+    """Write the JSON run report and Prometheus textfile, if configured."""
+    telemetry = getattr(conf.clushible, "telemetry", None)
+    if telemetry is None:
+        return None
+
+    report = telemetry.report(conf)
+    try:
+        if conf.clushible.run_report:
+            path = Path(
+                conf.clushible.run_report.format(run_id=report["run_id"])
+            )
+            _write_atomic(path, json.dumps(report, indent=2) + "\n")
+            if conf.core.verbose > 0:
+                msg.info(f"Run report written to {path}")
+        if conf.clushible.prom_textfile:
+            _write_atomic(
+                Path(conf.clushible.prom_textfile), prometheus_text(report)
+            )
+    except OSError as e:
+        msg.warn(f"Could not write telemetry: {e}")
+    return report
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3.12
+import hashlib
+import shutil
+import subprocess
+from pathlib import Path
+
+from ClusterShell.NodeSet import NodeSet
+from ClusterShell.Task import task_self
+
+from . import msg
+from .errors import ClushibleError
+from .stage import _remote_runners, stage_path
+
+# Runner-side layout under conf.clushible.git_cache:
+#   repo.git/            bare object store, refs/clushible/<commit> per sync
+#                        (keeps the commit reachable and tells the
+#                        controller what not to bundle next time)
+#   <commit>/            detached worktree checkout of that commit
+REPO = "repo.git"
+REF_PREFIX = "refs/clushible/"
+
+
+def _git(conf, *args) -> str:
+    """Run git in the local project and return its stripped stdout."""
+    proc = subprocess.run(
+        ["git", "-C", conf.ansible.project_dir, *args],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+    )
+    if proc.returncode != 0:
+        raise ClushibleError(
+            f"git {' '.join(args)} failed in '{conf.ansible.project_dir}': {proc.stderr.decode('utf-8').strip()}"
+        )
+    return proc.stdout.decode("utf-8").strip()
+
+
+def _git_ok(conf, *args) -> bool:
+    """Whether git succeeds in the local project (for test-like commands)."""
+    proc = subprocess.run(
+        ["git", "-C", conf.ansible.project_dir, *args],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+    )
+    return proc.returncode == 0
+
+
+def _has_commit(conf, commit: str) -> bool:
+    return _git_ok(conf, "cat-file", "-e", f"{commit}^{{commit}}")
+
+
+def _is_ancestor(conf, commit: str, of: str) -> bool:
+    return _git_ok(conf, "merge-base", "--is-ancestor", commit, of)
+
+
+def runner_path(conf, path) -> str:
+    """Where path lives on the runners.
+
+    With transport=git, paths inside the project's git tree map into the
+    runner's cached checkout; anything else (vault password file, staged
+    slices) is used as is.
+    """
+    path = str(path)
+    checkout = getattr(conf.clushible, "checkout", None)
+    if conf.clushible.transport != "git" or not checkout:
+        return path
+
+    p = Path(path)
+    if not p.is_absolute():
+        return path
+    try:
+        rel = p.resolve().relative_to(conf.clushible.git_root)
+    except ValueError:
+        return path
+    return str(Path(checkout) / rel)
+
+
+def _probe(conf, runners: NodeSet, checkout: Path, repo: Path) -> dict:
+    """runner -> (checkout ready, commits already in its object store)."""
+    cmd = (
+        f"test -e {checkout}/.git && echo ready;"
+        f" git --git-dir={repo} for-each-ref {REF_PREFIX} 2>/dev/null; true"
+    )
+    t = task_self()
+    t.run(cmd, nodes=runners)
+
+    state = {r: (False, frozenset()) for r in runners}
+    for buf, nodelist in t.iter_buffers(match_keys=runners):
+        lines = buf.message().decode("utf-8").splitlines()
+        ready = "ready" in lines
+        # "<objectname> commit\t<refname>"
+        known = frozenset(
+            line.split()[0]
+            for line in lines
+            if line.strip() and line != "ready"
+        )
+        for r in nodelist:
+            state[r] = (ready, known)
+    return state
+
+
+def _bundle_dir(conf) -> Path:
+    """Bundles sit next to, not in, the stage so push_stage skips them."""
+    return stage_path(conf).with_name(f"{conf.clushible.run_id}.git")
+
+
+def _bundle(conf, commit: str, basis: list) -> Path:
+    """Bundle with commit's history minus what basis already covers."""
+    digest = hashlib.sha1(" ".join([commit, *basis]).encode("utf-8"))
+    path = _bundle_dir(conf) / f"{digest.hexdigest()[:16]}.bundle"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _git(
+            conf,
+            "bundle",
+            "create",
+            "-q",
+            str(path),
+            "HEAD",
+            *(f"^{b}" for b in basis),
+        )
+    return path
+
+
+def sync_project(conf) -> None:
+    """Ship the project's HEAD commit to every runner (transport=git).
+
+    Runners keep a bare object store and one checkout per commit under
+    git_cache. Each runner only gets a bundle of the objects it is
+    missing, worked out from the commits it already holds; runners that
+    have the checkout, or a commit descending from HEAD, get none.
+    conf.clushible.checkout is set to the runner-side project directory
+    and runners that fail to sync are dropped from conf.clushible.runners.
+    """
+    git_root = Path(_git(conf, "rev-parse", "--show-toplevel")).resolve()
+    commit = _git(conf, "rev-parse", "HEAD")
+    if _git(conf, "status", "--porcelain", "--untracked-files=no"):
+        msg.warn(
+            f"Uncommitted changes in '{conf.ansible.project_dir}' are not shipped with transport=git."
+        )
+
+    cache = Path(conf.clushible.git_cache)
+    repo = cache / REPO
+    checkout = cache / commit
+    conf.clushible.git_root = str(git_root)
+    conf.clushible.checkout = str(checkout)
+
+    runners = NodeSet(conf.clushible.runners)
+    remote = _remote_runners(conf)
+    state = _probe(conf, runners, checkout, repo)
+
+    # Runners holding the same commits get the same bundle
+    groups = dict()
+    for r, (ready, known) in state.items():
+        if not ready:
+            groups.setdefault(known, NodeSet()).add(r)
+
+    t = task_self()
+    for known, nodes in groups.items():
+        if commit in known:
+            fetch = ""
+        elif any(_is_ancestor(conf, commit, c) for c in known):
+            # HEAD is in the history of a commit the runner holds (e.g. a
+            # rollback): nothing to ship, just keep it reachable
+            fetch = (
+                f" git --git-dir={repo} update-ref"
+                f" {REF_PREFIX}{commit} {commit} &&"
+            )
+        else:
+            basis = sorted(c for c in known if _has_commit(conf, c))
+            bundle = _bundle(conf, commit, basis)
+            copy_to = nodes.intersection(remote)
+            if len(copy_to) > 0:
+                t.run(
+                    f"{conf.clushible.mkdir} -p {bundle.parent}", nodes=copy_to
+                )
+                t.copy(str(bundle), str(bundle.parent), nodes=copy_to)
+                t.resume()
+            fetch = (
+                f" git --git-dir={repo} fetch -q {bundle}"
+                f" HEAD:{REF_PREFIX}{commit} &&"
+            )
+            if conf.core.verbose > 0:
+                msg.info(
+                    f"git: {bundle.stat().st_size} byte bundle ({len(basis)} known commits) for {nodes}"
+                )
+
+        t.run(
+            f"{conf.clushible.mkdir} -p {cache} &&"
+            f" git init -q --bare {repo} &&{fetch}"
+            f" {{ test -e {checkout}/.git ||"
+            f" git --git-dir={repo} worktree add -q -f --detach"
+            f" {checkout} {commit}; }}",
+            nodes=nodes,
+        )
+
+        for rc, nodelist in t.iter_retcodes():
+            if rc == 0:
+                continue
+            failed = NodeSet.fromlist(nodelist)
+            for buf, _ in t.iter_errors(match_keys=failed):
+                msg.warn(buf.message().decode("utf-8", errors="replace"))
+            msg.warn(
+                f"git sync of {commit[:12]} failed on {failed} (RC {rc}); excluding from runners."
+            )
+            runners.difference_update(failed)
+
+    bundles = _bundle_dir(conf)
+    if bundles.exists():
+        if len(remote) > 0:
+            t.run(f"/bin/rm -rf {bundles}", nodes=remote)
+        shutil.rmtree(bundles, ignore_errors=True)
+
+    conf.clushible.runners = str(runners)
+    if conf.core.verbose > 0:
+        msg.info(f"git: {commit[:12]} checked out at {checkout} on {runners}")
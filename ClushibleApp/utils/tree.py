@@ -0,0 +1,168 @@
+#!/usr/bin/env python3.12
+import shlex
+import socket
+import tempfile
+
+from ClusterShell.NodeSet import NodeSet
+from ClusterShell.Task import task_self
+from ClusterShell.Topology import TopologyError
+
+from . import msg
+from .errors import ClushibleError
+from ..config.Config import to_argv
+
+# Gateways relay commands and output with ClusterShell's own gateway
+# (python -m ClusterShell.Gateway), so they need ClusterShell installed;
+# in nested mode they also need clushible.
+
+# Options nested gateways don't take from the controller: its own
+# invocation, targets and runners, the tree itself, what it already did
+# before dispatching (reachability, rolling batches, retries) and its
+# reports and output formatting
+NESTED_SKIP = {
+    "core.config",
+    "core.dump_config_template",
+    "core.version",
+    "clushible.runners",
+    "clushible.targets",
+    "clushible.nsets",
+    "clushible.valid_targets",
+    "clushible.disable_target_validation",
+    "clushible.partition_only",
+    "clushible.simulate",
+    "clushible.reach_check",
+    "clushible.reach_port",
+    "clushible.reach_timeout",
+    "clushible.reach_ttl",
+    "clushible.max_inflight",
+    "clushible.max_fail_pct",
+    "clushible.retry_failed",
+    "clushible.run_report",
+    "clushible.prom_textfile",
+    "clushible.stream",
+    "clushible.collate",
+    "clushible.coll_header",
+    "clushible.topology",
+    "clushible.gateways",
+    "clushible.tree_nested",
+    "clushible.clushible_cmd",
+    "clushible.relay",
+}
+
+
+def _generated_topology(conf) -> str:
+    """topology.conf routing controller -> gateways -> runners.
+
+    Runners are split evenly over the gateways, each gateway getting its
+    own route so nested mode can tell which runners are whose.
+    """
+    gateways = NodeSet(conf.clushible.gateways)
+    runners = NodeSet(conf.clushible.runners)
+    runners.difference_update(gateways)
+
+    root = socket.gethostname().split(".")[0]
+    lines = ["[routes]", f"{root}: {gateways}"]
+    for gw, leaves in zip(gateways, runners.split(len(gateways))):
+        if len(leaves):
+            lines.append(f"{gw}: {leaves}")
+    return "\n".join(lines) + "\n"
+
+
+def gateway_leaves(topology) -> dict:
+    """{gateway: runners behind it} for the first level of topology.
+
+    A route group of several gateways shares its runners out evenly.
+    """
+    leaves = dict()
+    for group in topology.root.children():
+        below = NodeSet()
+        stack = list(group.children())
+        while stack:
+            g = stack.pop()
+            below.update(g.nodeset)
+            stack.extend(g.children())
+        gateways = NodeSet(group.nodeset)
+        for gw, part in zip(gateways, below.split(len(gateways))):
+            leaves[gw] = str(part)
+    return leaves
+
+
+def use_tree(conf, task=None) -> None:
+    """Route task's commands (this thread's by default) through the tree.
+
+    ClusterShell tasks are per thread, so a thread dispatching after
+    setup_tree() ran on another one needs the topology loaded again.
+    """
+    task = task or task_self()
+    try:
+        if conf.clushible.topology:
+            task.load_topology(conf.clushible.topology)
+        else:
+            generated = getattr(conf.clushible, "generated_topology", None)
+            with tempfile.NamedTemporaryFile(
+                "w", prefix="clushible-topology.", suffix=".conf"
+            ) as f:
+                f.write(generated or _generated_topology(conf))
+                f.flush()
+                task.load_topology(f.name)
+    except (OSError, TopologyError) as e:
+        raise ClushibleError(f"Unable to load topology: {e}")
+    task.set_default("auto_tree", True)
+
+
+def setup_tree(conf) -> bool:
+    """Route runner commands through gateways, if configured.
+
+    Loads conf's topology file (or one generated from --gateways) into the
+    ClusterShell task, after which every runner command, copy and output
+    stream is relayed by the gateways. Returns whether a tree is in use.
+    """
+    if not conf.clushible.topology and not conf.clushible.gateways:
+        return False
+
+    t = task_self()
+    if not conf.clushible.topology:
+        conf.clushible.generated_topology = _generated_topology(conf)
+    use_tree(conf, t)
+    if not conf.clushible.topology:
+        # Gateways only relay; they don't run playbooks themselves
+        runners = NodeSet(conf.clushible.runners)
+        runners.difference_update(conf.clushible.gateways)
+        conf.clushible.runners = str(runners)
+
+    if conf.core.verbose > 0:
+        msg.info(f"Topology:\n{t.topology}")
+
+    if conf.clushible.tree_nested:
+        # Each gateway sub-partitions its chunks over its own runners
+        runners = NodeSet(conf.clushible.runners)
+        conf.clushible.tree_leaves = dict()
+        for gw, r in gateway_leaves(t.topology).items():
+            mine = NodeSet(r).intersection(runners)
+            if len(mine):
+                conf.clushible.tree_leaves[gw] = str(mine)
+    return True
+
+
+def nested_cmd(conf, target: NodeSet, gateway: str) -> str:
+    """clushible command a gateway runs to play target on its runners.
+
+    Every option set for this run is passed on but those in NESTED_SKIP,
+    and forks when they're auto-detected (the gateway sizes its own).
+    --relay has it pass its runners' callback records through unchanged
+    so they are parsed here as if the runners were ours.
+    """
+    skip = set(NESTED_SKIP)
+    if getattr(conf.clushible, "auto_forks", False):
+        skip.add("ansible.forks")
+    cmd = [
+        conf.clushible.clushible_cmd,
+        "--relay",
+        "--disable-target-validation",
+        "-w",
+        str(target),
+        "--runners",
+        conf.clushible.tree_leaves[gateway],
+        *to_argv(conf, skip),
+    ]
+    return " ".join(shlex.quote(c) for c in cmd)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Dispatcher and collation benchmarks on a single machine.
+
+Runners are local ClusterShell exec workers (bench[1-R] all run on this
+host) and ansible-playbook is benchmarks/fake-ansible-playbook, so no
+cluster or Ansible install is needed. Each target count runs in its own
+process so peak RSS is per size.
+
+    python benchmarks/bench.py                       # 100,1k,10k,50k
+    python benchmarks/bench.py --sizes 100,1000 --time lognormal:-4,0.5
+    python benchmarks/bench.py --save benchmarks/baseline.json
+    python benchmarks/bench.py --baseline benchmarks/baseline.json
+
+Per size it reports the makespan of dispatch (Dispatcher's "dispatch"
+phase), controller CPU and peak RSS, the in-run collation time and
+collate_results() over the same output. With --baseline, any metric more
+than --tolerance worse than the saved one is a regression (exit 1).
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+
+FAKE = HERE / "fake-ansible-playbook"
+SIZES = [100, 1000, 10000, 50000]
+
+# Lower is better for every metric compared against a baseline
+METRICS = ("makespan", "cpu", "rss_kb", "collation", "collate_results")
+
+
+def _conf_file(tmp: Path, args) -> Path:
+    (tmp / "play.yml").write_text("- hosts: all\n")
+    (tmp / "inventory").write_text("")
+    (tmp / "vault").write_text("")
+    conf = tmp / "clushible.toml"
+    conf.write_text(
+        "[ansible]\n"
+        f'playbook_cmd = "{FAKE}"\n'
+        f'project_dir = "{tmp}"\n'
+        f'inventory = "{tmp / "inventory"}"\n'
+        f'playbook = "{tmp / "play.yml"}"\n'
+        f'vault_password_file = "{tmp / "vault"}"\n'
+        "[clushible]\n"
+        f'runners = "bench[1-{args.runners}]"\n'
+        'limit = "file"\n'
+        f'stage_dir = "{tmp / "stage"}"\n'
+        "stage_shared = true\n"
+        'history = ""\n'
+        'log_store = ""\n'
+    )
+    return conf
+
+
+def run_one(size: int, args) -> dict:
+    """Benchmark one target count in this process."""
+    from ClusterShell.Defaults import DEFAULTS
+
+    # Every runner is a local process
+    DEFAULTS.distant_workername = "exec"
+
+    from ClushibleApp import Dispatcher, load_config, plan, probe_runners
+    from ClushibleApp.utils.dispatch import collate_results
+
+    os.environ["CLUSHIBLE_FAKE_TIME"] = args.time
+    os.environ["CLUSHIBLE_FAKE_TASKS"] = str(args.tasks)
+
+    with tempfile.TemporaryDirectory(prefix="clushible-bench.") as tmp:
+        conf = load_config([], files=[str(_conf_file(Path(tmp), args))])
+        conf.ansible.forks = args.forks
+        conf.core.verbose = 0
+
+        targets = f"b[1-{size}]"
+        capacity = probe_runners(conf)
+        p = plan(targets, capacity, conf=conf)
+
+        # Keep the raw output for collate_results() as well
+        lines = []
+        d = Dispatcher(conf, sink=lambda r, c, line: lines.append(line))
+
+        ru0 = resource.getrusage(resource.RUSAGE_SELF)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+        try:
+            result = d.execute(p)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        ru1 = resource.getrusage(resource.RUSAGE_SELF)
+
+        buffers = ["\n".join(lines).encode("utf-8")]
+        t0 = time.perf_counter()
+        collate_results(conf, buffers)
+        collate = time.perf_counter() - t0
+
+    # Playbook logs the fake run left behind on the "runners"
+    run_id = result.telemetry["run_id"]
+    for f in glob.glob(f"/var/tmp/clushible/{run_id}.*.log"):
+        os.unlink(f)
+
+    phases = result.telemetry["phases"]
+    return {
+        "size": size,
+        "chunks": len(p.chunks),
+        "reported": len(result.status),
+        "makespan": phases["dispatch"],
+        "cpu": (ru1.ru_utime + ru1.ru_stime) - (ru0.ru_utime + ru0.ru_stime),
+        "rss_kb": ru1.ru_maxrss,
+        "collation": phases.get("collation", 0.0),
+        "collate_results": collate,
+    }
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """Metrics worse than baseline by more than tolerance (a fraction)."""
+    regressions = []
+    for r in results:
+        base = baseline.get(str(r["size"]))
+        if base is None:
+            continue
+        for m in METRICS:
+            # Ignore noise on tiny absolute values
+            if base[m] > 0.01 and r[m] > base[m] * (1 + tolerance):
+                regressions.append(
+                    f"{r['size']} targets: {m} {r[m]:.3f} > baseline {base[m]:.3f}"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in SIZES),
+        help="Comma-separated target counts",
+    )
+    parser.add_argument("--runners", type=int, default=8)
+    parser.add_argument("--forks", type=int, default=64)
+    parser.add_argument("--tasks", type=int, default=3)
+    parser.add_argument(
+        "--time",
+        default="const:0",
+        help="Per-host time distribution (see fake-ansible-playbook)",
+    )
+    parser.add_argument("--save", help="Write results as a baseline file")
+    parser.add_argument("--baseline", help="Compare against a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        print(json.dumps(run_one(args.one, args)))
+        return 0
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        cmd = [sys.executable, __file__, "--one", str(size)]
+        for opt in ("runners", "forks", "tasks", "time"):
+            cmd += [f"--{opt}", str(getattr(args, opt))]
+        out = subprocess.run(
+            cmd, capture_output=True, text=True, stdin=subprocess.DEVNULL
+        )
+        if out.returncode != 0:
+            sys.stderr.write(out.stderr)
+            return 1
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        results.append(r)
+        print(
+            f"{r['size']:>6} targets {r['chunks']:>4} chunks:"
+            f" makespan {r['makespan']:.3f}s cpu {r['cpu']:.3f}s"
+            f" rss {r['rss_kb'] // 1024}MB collation {r['collation']:.3f}s"
+            f" collate_results {r['collate_results']:.3f}s"
+            f" ({r['reported']}/{r['size']} reported)"
+        )
+
+    if args.save:
+        Path(args.save).write_text(
+            json.dumps({str(r["size"]): r for r in results}, indent=2) + "\n"
+        )
+
+    failed = [r["size"] for r in results if r["reported"] != r["size"]]
+    if failed:
+        print(f"Not every host reported a recap at sizes {failed}")
+        return 1
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
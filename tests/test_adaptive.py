@@ -0,0 +1,76 @@
+import json
+import subprocess
+import time
+
+from ClusterShell.NodeSet import NodeSet
+
+from ClushibleApp.config import load_config
+from ClushibleApp.utils import ansible
+from ClushibleApp.utils.adaptive import ForksController
+
+
+def load(load_avg, c=4, m=10**6):
+    return json.dumps({"e": "load", "l": load_avg, "c": c, "m": m})
+
+
+def test_grows_while_under_load():
+    ctl = ForksController({"r1": 8}, fork_mem_kb=1000)
+    ctl.sample("r1", load(1.0))
+    assert ctl.next_forks("r1", 8) == 10
+    assert ctl.validated == {"r1": 8}
+
+
+def test_shrinks_when_overloaded():
+    ctl = ForksController({"r1": 8}, fork_mem_kb=1000)
+    ctl.sample("r1", load(1.0))
+    ctl.sample("r1", load(8.0))
+    assert ctl.next_forks("r1", 8) == 6
+    assert ctl.validated == {}
+
+
+def test_shrinks_when_short_of_memory():
+    ctl = ForksController({"r1": 8}, fork_mem_kb=1000)
+    ctl.sample("r1", load(0.1, m=500))
+    assert ctl.next_forks("r1", 8) == 6
+
+
+def test_unsampled_chunk_keeps_forks():
+    ctl = ForksController({"r1": 8}, fork_mem_kb=1000)
+    assert ctl.next_forks("r1", 8) == 8
+    assert ctl.validated == {}
+
+
+def test_underfilled_chunk_is_not_validated():
+    ctl = ForksController({"r1": 8}, fork_mem_kb=1000)
+    ctl.sample("r1", load(1.0))
+    assert ctl.next_forks("r1", 2) == 10
+    assert ctl.validated == {}
+
+
+def test_ignores_malformed_samples():
+    ctl = ForksController({"r1": 8}, fork_mem_kb=1000)
+    ctl.sample("r1", '{"e":"load","l":')
+    ctl.sample("r1", '{"e":"load"}')
+    assert ctl.next_forks("r1", 8) == 8
+
+
+def test_sampler_does_not_hold_short_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(ansible, "RUNNER_LOG_DIR", str(tmp_path / "logs"))
+    conf = load_config(
+        ["--runners", "r1", "--adaptive-forks", "--sample-interval", "5"],
+        files=[],
+    )
+    conf.ansible.project_dir = str(tmp_path)
+    conf.ansible.playbook_cmd = "/bin/true"
+    conf.clushible.run_id = "test"
+    conf.clushible.mkdir = "mkdir"
+    conf.clushible.mktemp = "mktemp"
+    cmd = ansible.generate_playbook_cmd(
+        conf, NodeSet("n1"), forks=1, playbook="p"
+    )
+    assert "sleep" in cmd
+    start = time.monotonic()
+    # Like the runner's stream, stdout is read until every writer is gone
+    out = subprocess.run(["/bin/sh", "-c", cmd], stdout=subprocess.PIPE)
+    assert out.returncode == 0
+    assert time.monotonic() - start < 2
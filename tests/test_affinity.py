@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from ClusterShell.NodeSet import NodeSet
+
+from ClushibleApp.utils.affinity import chunk_homes, split_local, target_homes
+from ClushibleApp.utils.dispatch import DispatchState
+
+
+def conf_map(table):
+    return SimpleNamespace(
+        clushible=SimpleNamespace(affinity="map", affinity_map=table)
+    )
+
+
+def test_target_homes_from_map():
+    conf = conf_map({"n[1-4]": "r1", "n[5-8]": "r2", "n[9-10]": "gone"})
+    homes = target_homes(conf, NodeSet("n[1-12]"), "r[1-2]")
+    # Targets without a live home runner go to any runner
+    assert homes == {"r1": NodeSet("n[1-4]"), "r2": NodeSet("n[5-8]")}
+
+
+def test_split_local_and_chunk_homes():
+    homes = {"r1": NodeSet("n[1-4]"), "r2": NodeSet("n[5-8]")}
+    chunks = split_local([NodeSet("n[3-6]"), NodeSet("n[9-10]")], homes)
+    assert [str(c) for c in chunks] == ["n[3-4]", "n[5-6]", "n[9-10]"]
+    assert chunk_homes(chunks, homes) == ["r1", "r2", ""]
+
+
+def test_runner_prefers_local_then_anyone():
+    state = DispatchState(
+        [NodeSet("n1"), NodeSet("n2"), NodeSet("n3")], ["r2", "", "r1"]
+    )
+    assert [c for _, c, _, _ in state.pull(1, runner="r1")] == [NodeSet("n3")]
+    assert [c for _, c, _, _ in state.pull(1, runner="r1")] == [NodeSet("n2")]
+
+
+def test_spills_over_only_while_home_is_busy():
+    state = DispatchState([NodeSet("n1"), NodeSet("n2")], ["r[1-2]", "r[1-2]"])
+    state.busy.add("r1")
+    assert state.pull(1, runner="r3") == []
+
+    state.busy.add("r2")
+    assert [c for _, c, _, _ in state.pull(1, runner="r3")] == [NodeSet("n1")]
+
+
+def test_spills_over_from_dead_home():
+    state = DispatchState([NodeSet("n1")], ["r1"])
+    state.dead["r1"] = "lost connection"
+    assert [c for _, c, _, _ in state.pull(1, runner="r2")] == [NodeSet("n1")]
@@ -0,0 +1,22 @@
+from ClushibleApp.utils.collate import Collator
+
+
+def test_collator_groups_in_first_seen_order():
+    c = Collator()
+    c.feed(
+        b'{"e":"ok","h":"n2","t":"a","m":""}\n'
+        b"n1: hello\n"
+        b'{"e":"ok","h":"n1","t":"a","m":""}\n'
+        b"garbage\n"
+        b"n3: hello\n"
+    )
+    assert len(c) == 2
+    assert c.render() == "n[1-2]: ok: a\nn[1,3]: hello"
+
+
+def test_collator_without_header():
+    c = Collator(header=False)
+    c.add("n1", "x")
+    c.add("n2", "x")
+    sep = "-" * 15
+    assert c.render() == "\n".join([sep, "n[1-2] (2)", sep, "x", ""])
@@ -0,0 +1,56 @@
+from ClusterShell.NodeSet import NodeSet
+
+from ClushibleApp.utils.dispatch import DispatchState
+
+
+def chunks(*sets):
+    return [NodeSet(s) for s in sets]
+
+
+def hosts(pulled):
+    return NodeSet.fromlist([c for _, c, _, _ in pulled])
+
+
+def test_pull_fills_up_to_forks():
+    state = DispatchState(chunks("n[1-4]", "n[5-8]", "n[9-12]"))
+    pulled = state.pull(10, runner="r1", fill=8)
+    assert hosts(pulled) == NodeSet("n[1-8]")
+    assert state.pending() == 1
+    assert state.inflight == 1
+
+
+def test_pull_fill_takes_at_least_one_chunk():
+    state = DispatchState(chunks("n[1-10]"))
+    assert hosts(state.pull(10, runner="r1", fill=4)) == NodeSet("n[1-10]")
+
+
+def test_pull_max_hosts_splits_chunk():
+    state = DispatchState(chunks("n[1-10]"))
+    pulled = state.pull(1, max_hosts=4, runner="r1")
+    assert hosts(pulled) == NodeSet("n[1-4]")
+    # The split part gets a new id and must be staged again
+    ((i, _, staged, _),) = pulled
+    assert i == 1 and not staged
+    assert state.orphaned() == NodeSet("n[5-10]")
+
+
+def test_pull_keeps_stages_apart():
+    state = DispatchState(chunks("n[1-2]", "n[3-4]"))
+    state.queues[""][1] = (1, NodeSet("n[3-4]"), True, 1)
+    assert hosts(state.pull(10, runner="r1")) == NodeSet("n[1-2]")
+
+
+def test_done_requeues_to_the_chunk_home():
+    state = DispatchState(chunks("n[1-2]", "n[3-4]"), ["r1", ""])
+    state.pull(1, runner="r1")
+    state.done("r1", "lost connection", NodeSet("n2"), 1, 0)
+    assert state.dead == {"r1": "lost connection"}
+    assert state.inflight == 0
+    ((i, c, staged, stage),) = state.queues["r1"]
+    assert (i, str(c), staged, stage) == (2, "n2", False, 1)
+
+
+def test_orphaned_empties_queues():
+    state = DispatchState(chunks("n[1-2]", "n[3-4]"), ["r1", ""])
+    assert state.orphaned() == NodeSet("n[1-4]")
+    assert state.pending() == 0
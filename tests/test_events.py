@@ -0,0 +1,108 @@
+import importlib.util
+
+import pytest
+
+from ClushibleApp.utils.events import CALLBACK_DIR, parse_line
+
+
+def test_parse_result_record():
+    e = parse_line('{"e":"failed","h":"n1","t":"install","m":"boom"}')
+    assert (e.host, e.status, e.task, e.msg) == (
+        "n1",
+        "failed",
+        "install",
+        "boom",
+    )
+    assert e.line() == "n1: failed: install - boom"
+
+
+def test_parse_task_record():
+    e = parse_line('{"e":"task","t":"Gathering Facts"}')
+    assert e.host is None
+    assert e.status == "task"
+    assert e.line() == "TASK [Gathering Facts]"
+
+
+def test_parse_recap_record():
+    e = parse_line(
+        '{"e":"recap","h":"n1","ok":3,"changed":1,"unreachable":0,'
+        '"failures":0,"skipped":0}'
+    )
+    assert e.status == "recap"
+    assert e.final_status() == "changed"
+    assert e.text() == "ok=3 changed=1 unreachable=0 failed=0 skipped=0"
+
+
+def test_parse_text_recap():
+    e = parse_line("n[1-2]: ok=2 changed=0 unreachable=1 failed=0 skipped=0")
+    assert e.host == "n[1-2]"
+    assert e.final_status() == "unreachable"
+
+
+def test_parse_text_line():
+    e = parse_line("n1: some message")
+    assert (e.host, e.status, e.msg) == ("n1", "text", "some message")
+
+
+def test_parse_rejects_other_lines():
+    assert parse_line("PLAY RECAP ****") is None
+    assert parse_line("not a host: x") is None
+    assert parse_line('{"e":"ok"}') is None
+    assert parse_line("{not json") is None
+    assert parse_line("[1, 2]") is None
+
+
+class _Named:
+    def __init__(self, name):
+        self.name = name
+
+    def get_name(self):
+        return self.name
+
+
+class _Result:
+    def __init__(self, host, task, result):
+        self.host = _Named(host)
+        self.task = _Named(task)
+        self.result = result
+
+
+class _Stats:
+    processed = {"n2": 1, "n1": 1}
+
+    def summarize(self, host):
+        return dict(ok=2, changed=int(host == "n1"), unreachable=0, failures=0)
+
+
+class _Display:
+    def __init__(self):
+        self.lines = []
+
+    def display(self, line):
+        self.lines.append(line)
+
+
+def test_callback_records_round_trip():
+    pytest.importorskip("ansible")
+    spec = importlib.util.spec_from_file_location(
+        "clushible_callback", CALLBACK_DIR / "clushible.py"
+    )
+    plugin = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(plugin)
+
+    cb = plugin.CallbackModule()
+    cb._display = _Display()
+    cb.v2_playbook_on_task_start(_Named("install"), False)
+    cb.v2_runner_on_ok(_Result("n1", "install", {"changed": True}))
+    cb.v2_runner_on_failed(_Result("n2", "install", {"msg": "boom"}))
+    cb.v2_playbook_on_stats(_Stats())
+
+    events = [parse_line(line) for line in cb._display.lines]
+    assert [e.line() for e in events] == [
+        "TASK [install]",
+        "n1: changed: install",
+        "n2: failed: install - boom",
+        "n1: ok=2 changed=1 unreachable=0 failed=0 skipped=0",
+        "n2: ok=2 changed=0 unreachable=0 failed=0 skipped=0",
+    ]
+    assert events[3].final_status() == "changed"
@@ -0,0 +1,76 @@
+import os
+import time
+
+from ClusterShell.NodeSet import NodeSet
+
+from ClushibleApp.config import load_config
+from ClushibleApp.utils.facts import (
+    fact_cache_env,
+    facts_path,
+    gather_facts,
+    seed_facts,
+)
+
+
+def facts_conf(tmp_path, ttl=3600):
+    conf = load_config(
+        ["--runners", "localhost", "--fact-cache", str(tmp_path / "facts")],
+        files=[],
+    )
+    conf.clushible.fact_cache_ttl = ttl
+    conf.clushible.stage_dir = str(tmp_path / "stage")
+    conf.clushible.run_id = "run"
+    return conf
+
+
+def write(path, text, age=0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    t = time.time() - age
+    os.utime(path, (t, t))
+
+
+def test_env_points_at_staged_cache(tmp_path):
+    conf = facts_conf(tmp_path, ttl=600)
+    env = fact_cache_env(conf)
+    assert "ANSIBLE_CACHE_PLUGIN=jsonfile" in env
+    assert f"ANSIBLE_CACHE_PLUGIN_CONNECTION={facts_path(conf)}" in env
+    assert "ANSIBLE_CACHE_PLUGIN_TIMEOUT=600" in env
+
+    conf.clushible.fact_cache = ""
+    assert fact_cache_env(conf) == ""
+
+
+def test_seed_stages_fresh_facts_of_targets(tmp_path):
+    conf = facts_conf(tmp_path)
+    cache = tmp_path / "facts"
+    write(cache / "n1", "{}")
+    write(cache / "s1_n2", "{}")
+    write(cache / "n3", "{}", age=7200)  # expired
+    write(cache / "n9", "{}")  # not a target
+
+    seed_facts(conf, [NodeSet("n[1-2]"), NodeSet("n3")])
+
+    staged = sorted(f.name for f in facts_path(conf).iterdir())
+    assert staged == ["n1", "s1_n2"]
+
+
+def test_gather_merges_newest_and_expires(tmp_path):
+    conf = facts_conf(tmp_path)
+    cache = tmp_path / "facts"
+    write(cache / "n1", "old", age=60)
+    write(cache / "n2", "newer", age=0)
+    write(cache / "n3", "stale", age=7200)
+
+    # What the (local) runner's ansible-playbook left in the stage
+    staged = facts_path(conf)
+    write(staged / "n1", "new", age=0)
+    write(staged / "n2", "older", age=60)
+    write(staged / "n4", "fresh", age=0)
+
+    gather_facts(conf)
+
+    assert (cache / "n1").read_text() == "new"
+    assert (cache / "n2").read_text() == "newer"
+    assert (cache / "n4").read_text() == "fresh"
+    assert not (cache / "n3").exists()
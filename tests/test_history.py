@@ -0,0 +1,72 @@
+from ClushibleApp.config import load_config
+from ClushibleApp.utils.history import (
+    cached_reach,
+    fscale_slowdowns,
+    host_costs,
+    known_costs,
+    recommended_forks,
+    record_forks,
+    record_reach,
+    record_runtimes,
+)
+
+
+def history_conf(path):
+    conf = load_config(["--history", str(path)], files=[])
+    conf.clushible.reach_ttl = 3600
+    return conf
+
+
+def test_missing_history_reads_empty_and_stays_missing(tmp_path):
+    conf = history_conf(tmp_path / "h.db")
+    assert known_costs(conf, ["n1"]) == {}
+    assert fscale_slowdowns(conf) == {}
+    assert recommended_forks(conf) == {}
+    assert cached_reach(conf, ["n1"]) == {}
+    assert not (tmp_path / "h.db").exists()
+
+
+def test_runtimes_and_slowdown_round_trip(tmp_path):
+    conf = history_conf(tmp_path / "sub" / "h.db")
+    record_runtimes(conf, {"n1": 2.0, "n2": 4.0})
+    assert known_costs(conf, ["n1", "n2", "n3"]) == {"n1": 2.0, "n2": 4.0}
+    assert host_costs(conf, ["n1", "n2", "n3"])["n3"] == 3.0
+
+    # Twice as slow at fscale 8: the moving average moves half way, and
+    # the slowdown is recorded
+    conf.clushible.sample_fscale = 8
+    record_runtimes(conf, {"n1": 4.0, "n2": 8.0})
+    assert known_costs(conf, ["n1"]) == {"n1": 3.0}
+    assert fscale_slowdowns(conf) == {8: 2.0}
+
+
+def test_forks_and_reach_round_trip(tmp_path):
+    conf = history_conf(tmp_path / "h.db")
+    record_forks(conf, {"r1": 12})
+    assert recommended_forks(conf) == {"r1": 12}
+
+    record_reach(conf, {"n1": True, "n2": False})
+    assert cached_reach(conf, ["n1", "n2", "n3"]) == {
+        "n1": True,
+        "n2": False,
+    }
+    conf.clushible.reach_ttl = 0
+    assert cached_reach(conf, ["n1"]) == {}
+
+
+def test_dry_run_records_nothing(tmp_path):
+    conf = history_conf(tmp_path / "h.db")
+    conf.core.dry_run = True
+    record_runtimes(conf, {"n1": 1.0})
+    record_forks(conf, {"r1": 4})
+    assert not (tmp_path / "h.db").exists()
+
+
+def test_unreadable_history_warns(tmp_path, capsys):
+    (tmp_path / "h.db").write_text("not a database")
+    conf = history_conf(tmp_path / "h.db")
+    assert known_costs(conf, ["n1"]) == {}
+    record_runtimes(conf, {"n1": 1.0})
+    err = capsys.readouterr().err
+    assert "Unable to read runtime history" in err
+    assert "Unable to record runtime history" in err
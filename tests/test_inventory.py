@@ -0,0 +1,98 @@
+import json
+import os
+
+from ClusterShell.NodeSet import NodeSet
+
+from ClushibleApp.config import load_config
+from ClushibleApp.utils.inventory import (
+    _inventory_hash,
+    _slice,
+    _yaml,
+    slice_file,
+    write_inventory_slices,
+)
+
+VAULTED = {"__ansible_vault": "$ANSIBLE_VAULT;1.1;AES256\n6162\n"}
+
+INVENTORY = {
+    "_meta": {"hostvars": {"n1": {"ip": "10.0.0.1"}, "n3": {}}},
+    "all": {"children": ["ungrouped", "compute", "login"], "vars": {"x": 1}},
+    "compute": {"children": ["rack1", "rack2"], "vars": {"secret": VAULTED}},
+    "rack1": {"hosts": ["n1", "n2"]},
+    "rack2": {"hosts": ["n3", "n4"]},
+    "login": {"hosts": ["l1"]},
+}
+
+
+def test_slice_keeps_hosts_groups_and_ancestors():
+    sliced = _slice(INVENTORY, NodeSet("n[1,3]"))
+    groups = sliced["all"]["children"]
+
+    assert sorted(groups) == ["compute", "rack1", "rack2"]
+    assert groups["rack1"]["hosts"] == {"n1": {"ip": "10.0.0.1"}}
+    assert groups["rack2"]["hosts"] == {"n3": {}}
+    assert groups["compute"]["children"] == {"rack1": {}, "rack2": {}}
+    assert groups["compute"]["vars"] == {"secret": VAULTED}
+    assert sliced["all"]["vars"] == {"x": 1}
+
+
+def test_yaml_flow_style_and_vault_passthrough():
+    assert _yaml({"a": [1, "b"], "c": None}) == '{"a": [1, "b"], "c": null}'
+    assert _yaml({"s": VAULTED}) == (
+        '{"s": !vault "$ANSIBLE_VAULT;1.1;AES256\\n6162\\n"}'
+    )
+
+
+def test_slices_written_and_vars_dirs_linked(tmp_path):
+    project = tmp_path / "project"
+    (project / "group_vars").mkdir(parents=True)
+    inventory = project / "hosts.yml"
+    inventory.write_text("all: {}\n")
+
+    conf = load_config([], files=[])
+    conf.ansible.inventory = str(inventory)
+    conf.clushible.inventory_cache = str(tmp_path / "cache")
+    conf.clushible.stage_dir = str(tmp_path / "stage")
+    conf.clushible.run_id = "run"
+
+    # Stands in for the ansible-inventory export
+    cache = tmp_path / "cache" / _inventory_hash(inventory)
+    cache.mkdir(parents=True)
+    (cache / "inventory.json").write_text(json.dumps(INVENTORY))
+
+    write_inventory_slices(conf, [NodeSet("n[1-2]"), NodeSet("l1")])
+
+    text = slice_file(conf, NodeSet("n[1-2]")).read_text()
+    assert '"n1": {"ip": "10.0.0.1"}' in text
+    assert "!vault" in text
+    assert '"login"' in slice_file(conf, NodeSet("l1")).read_text()
+
+    link = tmp_path / "stage" / "run" / "inventory" / "group_vars"
+    assert os.readlink(link) == str((project / "group_vars").resolve())
+    assert not (
+        tmp_path / "stage" / "run" / "inventory" / "host_vars"
+    ).exists()
+
+
+def test_vars_dirs_linked_into_git_checkout(tmp_path):
+    project = tmp_path / "project"
+    (project / "inv" / "host_vars").mkdir(parents=True)
+    inventory = project / "inv" / "hosts.yml"
+    inventory.write_text("all: {}\n")
+
+    conf = load_config(["--transport", "git"], files=[])
+    conf.ansible.inventory = str(inventory)
+    conf.clushible.inventory_cache = str(tmp_path / "cache")
+    conf.clushible.stage_dir = str(tmp_path / "stage")
+    conf.clushible.run_id = "run"
+    conf.clushible.git_root = str(project.resolve())
+    conf.clushible.checkout = "/var/cache/clushible/abc123"
+
+    cache = tmp_path / "cache" / _inventory_hash(inventory)
+    cache.mkdir(parents=True)
+    (cache / "inventory.json").write_text(json.dumps(INVENTORY))
+
+    write_inventory_slices(conf, [NodeSet("n1")])
+
+    link = tmp_path / "stage" / "run" / "inventory" / "host_vars"
+    assert os.readlink(link) == "/var/cache/clushible/abc123/inv/host_vars"
@@ -0,0 +1,39 @@
+from ClushibleApp.utils.logstore import LogStore, host_of
+
+
+def test_host_of():
+    assert host_of('{"e":"ok","h":"n1","t":"a","m":""}') == "n1"
+    assert host_of("n2: ok=1 changed=0") == "n2"
+    assert host_of('{"e":"task","t":"a"}') is None
+    assert host_of("PLAY RECAP ***") is None
+
+
+def test_round_trip_by_host_and_run(tmp_path):
+    store = LogStore(tmp_path)
+    w = store.writer("20260101-0000")
+    w.add_line("n1", b"n1: first")
+    w.add_line("n2", b"n2: other")
+    w.add_line("n1", b"n1: second")
+    assert w.close() == 2
+
+    w = store.writer("20260102-0000")
+    w.add_line("n1", b"n1: later")
+    assert w.close() == 1
+    store.close()
+
+    # Index and data survive reopening
+    store = LogStore(tmp_path)
+    assert store.runs("n1") == [("20260102-0000", 1), ("20260101-0000", 2)]
+    assert store.read("n1") == "n1: later\n"
+    assert store.read("n1", "20260101-0000") == "n1: first\nn1: second\n"
+    assert store.read("n2") == "n2: other\n"
+    assert store.read("n3") is None
+    assert store.read("n2", "20260102-0000") is None
+    store.close()
+
+
+def test_empty_writer_writes_nothing(tmp_path):
+    store = LogStore(tmp_path)
+    assert store.writer("run").close() == 0
+    assert not store.data_file("run").exists()
+    store.close()
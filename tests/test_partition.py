@@ -0,0 +1,29 @@
+from ClusterShell.NodeSet import NodeSet
+
+from ClushibleApp.utils.partition import balanced, pack, scatter
+
+
+def test_pack_slices_by_forks():
+    sets = pack(NodeSet("n[1-10]"), 4)
+    assert [str(s) for s in sets] == ["n[1-4]", "n[5-8]", "n[9-10]"]
+
+
+def test_scatter_even_counts():
+    sets = scatter(NodeSet("n[1-10]"), 3)
+    assert sorted(len(s) for s in sets) == [3, 3, 4]
+
+
+def test_balanced_evens_out_cost():
+    targets = NodeSet("n[1-6]")
+    costs = {"n1": 10, "n2": 1, "n3": 1, "n4": 1, "n5": 1, "n6": 6}
+    sets = balanced(targets, 2, costs)
+
+    # The expensive host goes alone, the rest share the other set; most
+    # expensive set first
+    assert [str(s) for s in sets] == ["n1", "n[2-6]"]
+    assert NodeSet.fromlist(sets) == targets
+
+
+def test_balanced_drops_empty_sets():
+    sets = balanced(NodeSet("n[1-2]"), 4, {"n1": 1, "n2": 1})
+    assert len(sets) == 2
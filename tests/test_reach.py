@@ -0,0 +1,86 @@
+import socket
+
+import pytest
+from ClusterShell.Defaults import DEFAULTS
+from ClusterShell.NodeSet import NodeSet
+
+from ClushibleApp.config import load_config
+from ClushibleApp.utils import reach
+from ClushibleApp.utils.reach import filter_reachable, probe_reach
+
+
+@pytest.fixture
+def exec_runners(monkeypatch):
+    """Run "remote" commands on localhost without ssh."""
+    monkeypatch.setattr(DEFAULTS, "distant_workername", "exec")
+
+
+@pytest.fixture
+def listener():
+    """A localhost port accepting connections."""
+    s = socket.socket()
+    s.bind(("localhost", 0))
+    s.listen(16)
+    yield s.getsockname()[1]
+    s.close()
+
+
+def reach_conf(tmp_path, port):
+    conf = load_config(["--runners", "localhost"], files=[])
+    conf.clushible.reach_port = port
+    conf.clushible.reach_timeout = 1.0
+    conf.clushible.history = str(tmp_path / "history.db")
+    return conf
+
+
+def test_probe_reach(exec_runners, listener, tmp_path):
+    conf = reach_conf(tmp_path, listener)
+    hosts = NodeSet("localhost,nohost.invalid")
+    assert probe_reach(conf, hosts, NodeSet("localhost")) == {
+        "localhost": True,
+        "nohost.invalid": False,
+    }
+
+
+def test_failed_probe_leaves_hosts_unknown(
+    exec_runners, listener, tmp_path, monkeypatch, capsys
+):
+    conf = reach_conf(tmp_path, listener)
+    monkeypatch.setattr(reach, "probe_cmd", lambda conf, hosts: "exit 3")
+    assert probe_reach(conf, NodeSet("n1"), NodeSet("localhost")) == {}
+    assert "probe failed on runner localhost" in capsys.readouterr().err
+
+
+def test_timed_out_probe_leaves_hosts_unknown(
+    exec_runners, listener, tmp_path, monkeypatch, capsys
+):
+    conf = reach_conf(tmp_path, listener)
+    conf.clushible.reach_timeout = 0.2
+    monkeypatch.setattr(reach, "REACH_SLACK", 0)
+    monkeypatch.setattr(reach, "probe_cmd", lambda conf, hosts: "sleep 5")
+    assert probe_reach(conf, NodeSet("n1"), NodeSet("localhost")) == {}
+    assert "timed out on runner localhost" in capsys.readouterr().err
+
+
+def test_filter_reachable_uses_cache(
+    exec_runners, listener, tmp_path, monkeypatch
+):
+    conf = reach_conf(tmp_path, listener)
+    targets = NodeSet("localhost,nohost.invalid")
+    alive, dead = filter_reachable(conf, targets, "localhost")
+    assert alive == NodeSet("localhost")
+    assert dead == NodeSet("nohost.invalid")
+
+    # Within reach_ttl the history answers; nothing is probed again
+    monkeypatch.setattr(reach, "probe_reach", None)
+    assert filter_reachable(conf, targets, "localhost") == (alive, dead)
+
+
+def test_filter_reachable_keeps_unknown_hosts(
+    exec_runners, tmp_path, monkeypatch
+):
+    conf = reach_conf(tmp_path, 1)
+    monkeypatch.setattr(reach, "probe_cmd", lambda conf, hosts: "exit 3")
+    alive, dead = filter_reachable(conf, NodeSet("n[1-3]"), "localhost")
+    assert alive == NodeSet("n[1-3]")
+    assert len(dead) == 0
@@ -0,0 +1,50 @@
+import time
+
+from ClusterShell.NodeSet import NodeSet
+
+from ClushibleApp.utils.report import Report
+
+
+def recap(host, **counts):
+    fields = dict(ok=1, changed=0, unreachable=0, failed=0, skipped=0)
+    fields.update(counts)
+    return f"{host}: " + " ".join(f"{k}={v}" for k, v in fields.items())
+
+
+def test_report_statuses():
+    r = Report()
+    r.add_line(recap("n1"))
+    r.add_line(recap("n2", changed=1))
+    r.add_line(recap("n3", failed=1))
+    r.add_line(recap("n4", unreachable=1, failed=1))
+    assert r.hosts("ok") == NodeSet("n1")
+    assert r.hosts("changed") == NodeSet("n2")
+    assert r.failed() == NodeSet("n[3-4]")
+
+
+def test_report_retry_replaces_but_keeps_changed():
+    r = Report()
+    r.add_line(recap("n1", failed=1))
+    r.add_line(recap("n2", changed=1))
+    r.add_line(recap("n1"))
+    r.add_line(recap("n2"))
+    assert r.hosts("ok") == NodeSet("n1")
+    assert r.hosts("changed") == NodeSet("n2")
+
+
+def test_report_no_recap_counts_as_failed():
+    r = Report()
+    r.dispatched(NodeSet("n[1-4]"))
+    r.add_line(recap("n1"))
+    r.orphaned(NodeSet("n2"))
+    r.abort(NodeSet("n3"), "too many failures")
+    assert r.no_recap() == NodeSet("n4")
+    assert r.failed() == NodeSet("n4")
+
+
+def test_report_reported_since():
+    r = Report()
+    r.add_line(recap("n1"))
+    since = time.monotonic()
+    r.add_line(recap("n2"))
+    assert r.reported_since(since) == NodeSet("n2")
@@ -0,0 +1,58 @@
+import pytest
+
+from ClushibleApp.api import Capacity, plan
+from ClushibleApp.config import load_config
+from ClushibleApp.utils.errors import ClushibleError
+from ClushibleApp.utils.rolling import Rollout, parse_cap
+
+
+def test_parse_cap():
+    assert parse_cap("", 100) == 0
+    assert parse_cap("25", 100) == 25
+    assert parse_cap("10%", 100) == 10
+    assert parse_cap("1%", 10) == 1
+    with pytest.raises(ClushibleError):
+        parse_cap("ten", 100)
+
+
+def test_canary_then_doubling():
+    r = Rollout(100, 5)
+    assert r.allowance() == 10
+    r.finished(10, 0, 1.0)
+    assert r.batch == 20
+    r.finished(20, 0, 1.0)
+    assert r.batch == 40
+
+
+def test_allowance_respects_cap():
+    r = Rollout(10, 5)
+    r.batch = 10
+    r.started(8)
+    assert r.allowance() == 2
+    r.released(8)
+    assert r.allowance() == 10
+
+
+def test_halves_on_failure_or_slowdown():
+    r = Rollout(100, 50)
+    r.batch = 8
+    r.finished(8, 1, 1.0)
+    assert r.batch == 4
+    r.finished(4, 0, 10.0)  # 0.4 hosts/s, under half of the best 8
+    assert r.batch == 2
+
+
+def test_aborts_past_max_fail_pct():
+    r = Rollout(100, 10)
+    r.finished(10, 1, 1.0)
+    assert r.aborted is None
+    r.finished(10, 2, 1.0)
+    assert "3/20 hosts failed" in r.aborted
+    assert r.allowance() == 0
+
+
+def test_invalid_cap_fails_plan():
+    conf = load_config(["--runners", "r1", "--max-inflight", "lots"], files=[])
+    capacity = Capacity(runners="r1", caps={"r1": 4}, forks={"r1": 4})
+    with pytest.raises(ClushibleError, match="Invalid --max-inflight"):
+        plan("n[1-4]", capacity, conf=conf)
@@ -0,0 +1,45 @@
+import pytest
+from ClusterShell.NodeSet import NodeSet
+
+from ClushibleApp.utils.simulate import (
+    CHUNK_OVERHEAD_S,
+    chunk_time,
+    simulate_queue,
+    slowdown_at,
+)
+
+
+def test_chunk_time():
+    costs = {"n1": 4.0, "n2": 1.0, "n3": 1.0}
+    # Slowest host bounds it
+    assert chunk_time(NodeSet("n[1-3]"), 3, costs, 1.0) == pytest.approx(
+        CHUNK_OVERHEAD_S + 4.0
+    )
+    # ... or total host time over forks
+    assert chunk_time(NodeSet("n[1-3]"), 1, costs, 2.0) == pytest.approx(
+        (CHUNK_OVERHEAD_S + 6.0) * 2.0
+    )
+
+
+def test_simulate_queue_fills_forks():
+    chunks = [NodeSet(f"n[{i}-{i + 1}]") for i in range(1, 9, 2)]
+    costs = {f"n{i}": 1.0 for i in range(1, 9)}
+    finish, busy = simulate_queue(chunks, {"r1": 4, "r2": 4}, costs)
+    # Each runner takes two chunks (4 hosts) in one playbook run
+    t = CHUNK_OVERHEAD_S + 1.0
+    assert finish == pytest.approx({"r1": t, "r2": t})
+    assert busy == finish
+
+
+def test_simulate_queue_free_runner_pulls_next():
+    chunks = [NodeSet("n1"), NodeSet("n2"), NodeSet("n3")]
+    costs = {"n1": 10.0, "n2": 1.0, "n3": 1.0}
+    finish, _ = simulate_queue(chunks, {"r1": 1, "r2": 1}, costs)
+    assert finish["r1"] == pytest.approx(CHUNK_OVERHEAD_S + 10.0)
+    assert finish["r2"] == pytest.approx(2 * (CHUNK_OVERHEAD_S + 1.0))
+
+
+def test_slowdown_interpolates():
+    slowdowns = {2: 1.0, 4: 2.0}
+    assert slowdown_at(slowdowns, 3) == pytest.approx(1.5)
+    assert slowdown_at(slowdowns, 8) == pytest.approx(4.0)
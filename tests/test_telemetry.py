@@ -0,0 +1,68 @@
+import json
+
+from ClushibleApp.config import load_config
+from ClushibleApp.utils.telemetry import (
+    Telemetry,
+    prometheus_text,
+    timer,
+    write_telemetry,
+)
+
+
+def recorded():
+    t = Telemetry()
+    t.add("partition", 0.5)
+    t.add("partition", 0.25)
+    t.chunk(0, "r1", 10, t.t0 + 1.0, t.t0 + 3.0, 100, 0)
+    t.chunk(2, "r1", 5, t.t0 + 3.0, t.t0 + 4.0, 50, 0)
+    t.chunk(1, 'r"2', 8, t.t0 + 1.0, t.t0 + 2.0, 80, 2)
+    return t
+
+
+def test_runner_totals():
+    r1 = recorded().runners()["r1"]
+    assert r1["chunks"] == 2
+    assert r1["hosts"] == 15
+    assert r1["bytes"] == 150
+    assert r1["busy"] == 3.0
+    assert (r1["first_start"], r1["last_end"]) == (1.0, 4.0)
+
+
+def test_prometheus_text():
+    conf = load_config([], files=[])
+    text = prometheus_text(recorded().report(conf))
+    lines = text.splitlines()
+
+    assert text.endswith("\n")
+    assert "# TYPE clushible_phase_seconds gauge" in lines
+    assert 'clushible_phase_seconds{phase="partition"} 0.75' in lines
+    assert 'clushible_runner_hosts{runner="r1"} 15' in lines
+    assert 'clushible_runner_output_bytes{runner="r\\"2"} 80' in lines
+    assert 'clushible_runner_last_end_seconds{runner="r1"} 4.0' in lines
+    # Every sample line is a metric name, optional labels and a number
+    for line in lines:
+        if not line.startswith("#"):
+            float(line.rsplit(" ", 1)[1])
+
+
+def test_write_telemetry(tmp_path):
+    conf = load_config([], files=[])
+    conf.clushible.run_report = str(tmp_path / "run-{run_id}.json")
+    conf.clushible.prom_textfile = str(tmp_path / "prom" / "clushible.prom")
+    conf.clushible.run_id = "abc"
+    conf.clushible.telemetry = recorded()
+    with timer(conf, "dispatch"):
+        pass
+
+    report = write_telemetry(conf)
+    saved = json.loads((tmp_path / "run-abc.json").read_text())
+    assert saved["phases"] == report["phases"]
+    assert "dispatch" in saved["phases"]
+    assert (
+        (tmp_path / "prom" / "clushible.prom").read_text().startswith("# HELP")
+    )
+
+
+def test_no_telemetry_no_report():
+    conf = load_config([], files=[])
+    assert write_telemetry(conf) is None
@@ -0,0 +1,106 @@
+import subprocess
+
+import pytest
+from ClusterShell.Defaults import DEFAULTS
+
+from ClushibleApp.config import load_config
+from ClushibleApp.utils.errors import ClushibleError
+from ClushibleApp.utils.transport import runner_path, sync_project
+
+
+def git(cwd, *args):
+    out = subprocess.run(
+        ["git", "-c", "user.email=t@t", "-c", "user.name=t", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+    return out.stdout.decode("utf-8").strip()
+
+
+def commit(repo, name, text):
+    (repo / name).write_text(text)
+    git(repo, "add", name)
+    git(repo, "commit", "-q", "-m", name)
+    return git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def exec_runners(monkeypatch):
+    """Run "remote" commands on localhost without ssh."""
+    monkeypatch.setattr(DEFAULTS, "distant_workername", "exec")
+
+
+@pytest.fixture
+def project(tmp_path):
+    """Project cloned from a file:// remote, as a controller would have."""
+    upstream = tmp_path / "upstream"
+    upstream.mkdir()
+    git(upstream, "init", "-q")
+    commit(upstream, "site.yml", "- hosts: all\n")
+    git(tmp_path, "clone", "-q", f"file://{upstream}", "project")
+    return tmp_path / "project"
+
+
+def git_conf(tmp_path, project, run_id):
+    conf = load_config(
+        ["--runners", "localhost", "--transport", "git", "-v"], files=[]
+    )
+    conf.ansible.project_dir = str(project)
+    conf.clushible.git_cache = str(tmp_path / "cache")
+    conf.clushible.stage_dir = str(tmp_path / "stage")
+    conf.clushible.run_id = run_id
+    conf.clushible.mkdir = "mkdir"
+    return conf
+
+
+def test_sync_ships_only_missing_objects(
+    tmp_path, project, exec_runners, capsys
+):
+    first = git(project, "rev-parse", "HEAD")
+    conf = git_conf(tmp_path, project, "r1")
+    sync_project(conf)
+
+    checkout = tmp_path / "cache" / first
+    assert conf.clushible.checkout == str(checkout)
+    assert conf.clushible.runners == "localhost"
+    assert (checkout / "site.yml").read_text() == "- hosts: all\n"
+    assert runner_path(conf, project / "site.yml") == str(
+        checkout / "site.yml"
+    )
+    assert runner_path(conf, "/etc/vault.pass") == "/etc/vault.pass"
+    assert "(0 known commits)" in capsys.readouterr().out
+
+    second = commit(project, "roles.yml", "[]\n")
+    conf = git_conf(tmp_path, project, "r2")
+    sync_project(conf)
+    assert (tmp_path / "cache" / second / "roles.yml").exists()
+    # Bundled on top of the commit the runner already had
+    assert "(1 known commits)" in capsys.readouterr().out
+
+    # Bundles are cleaned up after the sync
+    assert not (tmp_path / "stage" / "r2.git").exists()
+
+
+def test_sync_ancestor_needs_no_bundle(
+    tmp_path, project, exec_runners, capsys
+):
+    first = git(project, "rev-parse", "HEAD")
+    commit(project, "roles.yml", "[]\n")
+    sync_project(git_conf(tmp_path, project, "r1"))
+    capsys.readouterr()
+
+    git(project, "checkout", "-q", first)
+    conf = git_conf(tmp_path, project, "r2")
+    sync_project(conf)
+
+    assert "bundle" not in capsys.readouterr().out
+    assert (tmp_path / "cache" / first / "site.yml").exists()
+    refs = git(tmp_path / "cache" / "repo.git", "for-each-ref")
+    assert f"refs/clushible/{first}" in refs
+
+
+def test_sync_outside_git_raises(tmp_path, exec_runners):
+    conf = git_conf(tmp_path, tmp_path, "r1")
+    with pytest.raises(ClushibleError):
+        sync_project(conf)
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+from ClusterShell.NodeSet import NodeSet
+from ClusterShell.Task import task_self
+
+from ClushibleApp import api
+from ClushibleApp.config import load_config
+from ClushibleApp.config.Config import to_argv
+from ClushibleApp.utils.errors import ClushibleError
+from ClushibleApp.utils.tree import nested_cmd, setup_tree, use_tree
+
+
+@pytest.fixture(autouse=True)
+def no_tree():
+    """Leave this thread's task without a topology for later tests."""
+    yield
+    task_self().topology = None
+
+
+def test_to_argv_round_trips():
+    argv = ["--runners", "r[1-2]", "-f", "7", "--dry-run", "-v", "-v"]
+    conf = load_config(argv, files=[])
+    again = load_config(to_argv(conf), files=[])
+    assert again.clushible.runners == "r[1-2]"
+    assert again.ansible.forks == 7
+    assert again.core.dry_run is True
+    assert again.core.verbose == 2
+
+
+def test_to_argv_skips_defaults_and_skip():
+    conf = load_config(["--runners", "r1", "-f", "7"], files=[])
+    assert to_argv(conf, {"clushible.runners"}) == ["--forks", "7"]
+
+
+def test_nested_cmd_passes_on_options():
+    conf = load_config(["--runners", "r1", "-f", "7", "-v"], files=[])
+    conf.clushible.tree_leaves = {"gw1": "r[1-2]"}
+    cmd = nested_cmd(conf, NodeSet("n[1-4]"), "gw1")
+    assert "--relay" in cmd and "-w 'n[1-4]'" in cmd
+    assert "--runners 'r[1-2]'" in cmd and "--runners r1" not in cmd
+    assert "--forks 7" in cmd and "--verbose" in cmd
+
+
+def test_nested_cmd_skips_auto_forks():
+    conf = load_config(["--runners", "r1", "-f", "7"], files=[])
+    conf.clushible.tree_leaves = {"gw1": "r1"}
+    conf.clushible.auto_forks = True
+    assert "--forks" not in nested_cmd(conf, NodeSet("n1"), "gw1").split()
+
+
+def test_bad_topology_raises(tmp_path):
+    conf = load_config(["--runners", "r1"], files=[])
+    conf.clushible.topology = str(tmp_path / "missing.conf")
+    with pytest.raises(ClushibleError, match="Unable to load topology"):
+        use_tree(conf)
+
+
+def test_execute_async_dispatches_with_topology(monkeypatch):
+    conf = load_config(
+        ["--gateways", "gw1", "--runners", "gw1,r[1-2]", "--dry-run"],
+        files=[],
+    )
+    conf.clushible.log_store = ""
+    assert setup_tree(conf)
+    assert conf.clushible.runners == "r[1-2]"
+
+    seen = dict()
+
+    def run(conf, chunks, sink=None, report=None):
+        seen["thread"] = threading.get_ident()
+        seen["topology"] = task_self().topology
+
+    monkeypatch.setattr(api, "stage_chunks", lambda conf, chunks: None)
+    monkeypatch.setattr(api, "cleanup_stage", lambda conf: None)
+    monkeypatch.setattr(api, "run", run)
+    plan = api.Plan(
+        targets="n[1-4]",
+        runners=conf.clushible.runners,
+        distribution="linear",
+        nsets=2,
+        forks=2,
+        runner_forks=(("r1", 2), ("r2", 2)),
+        chunks=("n[1-2]", "n[3-4]"),
+    )
+    asyncio.run(api.Dispatcher(conf).execute_async(plan))
+    assert seen["thread"] != threading.get_ident()
+    assert seen["topology"] is not None